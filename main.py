@@ -1,25 +1,152 @@
+import time
+# بداية تحميل الملف: أول نقطة في الخط الزمني لـ StartupProfiler إذا تعذر معرفة وقت بدء العملية
+MODULE_STARTED = time.time()
 import flet as ft
-import qrcode
+import asyncio
 from datetime import datetime, timedelta
 import random
+import re
 import os
-import cv2
-from pyzbar import pyzbar
-import pandas as pd
+import base64
+import functools
+import hashlib
+import importlib.util
+import io
+import json
+from collections import OrderedDict
+import multiprocessing
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
 import sqlite3
-import time
+import sys
 import threading
+import weakref
 import webbrowser
+from urllib.parse import quote, unquote
+
+def process_start_time():
+    # وقت بدء العملية (المفسّر) من /proc في لينكس وأندرويد، و None في غيرها
+    try:
+        with open("/proc/self/stat") as f:
+            ticks = int(f.read().rpartition(")")[2].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return time.time() - (uptime - ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+class StartupProfiler:
+    # خط زمني لمراحل فتح البرنامج + زمن استيراد كل وحدة ثقيلة عند أول استخدام لها
+    # المراحل: (الاسم، البداية، النهاية، الخيط) بتوقيت time.time()، وتُعرض بالمللي ثانية من بدء العملية
+    def __init__(self, module_started):
+        self._lock = threading.Lock()
+        self.stages = []
+        self.imports = []
+        started = process_start_time()
+        self.origin = started if started is not None and started <= module_started else module_started
+        if started is not None:
+            self.record("interpreter_start", self.origin, self.origin)
+
+    def record(self, stage, start, end=None):
+        entry = (stage, start, time.time() if end is None else end, threading.current_thread().name)
+        with self._lock:
+            self.stages = self.stages + [entry]
+
+    def record_once(self, stage, start):
+        if not self.has(stage):
+            self.record(stage, start)
+
+    def has(self, stage):
+        return any(entry[0] == stage for entry in self.stages)
+
+    def record_import(self, name, start, end):
+        with self._lock:
+            self.imports = self.imports + [(name, start, end, threading.current_thread().name)]
+
+    def profiled(self, stage):
+        def decorator(method):
+            @functools.wraps(method)
+            def wrapper(*args, **kwargs):
+                start = time.time()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    self.record(stage, start)
+            return wrapper
+        return decorator
+
+    def _entries(self, entries):
+        return [{
+            "name": name,
+            "start_ms": round((start - self.origin) * 1000, 1),
+            "duration_ms": round((end - start) * 1000, 1),
+            "thread": thread
+        } for name, start, end, thread in entries]
 
-# إنشاء مجلدات لتخزين الملفات
-if not os.path.exists("students"):
-    os.makedirs("students")
-if not os.path.exists("reports"):
-    os.makedirs("reports")
+    def report(self):
+        return {
+            "origin": datetime.fromtimestamp(self.origin).isoformat(timespec="milliseconds"),
+            "origin_is_process_start": self.has("interpreter_start"),
+            # المراحل بترتيب انتهائها، فتُقرأ كقصة الفتح: ماذا اكتمل قبل ماذا
+            "stages": self._entries(sorted(self.stages, key=lambda entry: entry[2])),
+            "imports": self._entries(sorted(self.imports, key=lambda entry: entry[1]))
+        }
+
+    def dump(self, file_path=None):
+        file_path = file_path or os.path.join("reports", f"startup_profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(self.report(), f, ensure_ascii=False, indent=2)
+        return file_path
+
+STARTUP = StartupProfiler(MODULE_STARTED)
+STARTUP.record("imports", MODULE_STARTED)
+
+class LazyModule:
+    # وكيل لوحدة ثقيلة: لا تُستورد إلا عند أول وصول لأحد خصائصها (الماسح، التقارير، رسم QR)
+    # حتى لا يدفع من يريد تسجيل حضور يدوي فقط ثمن تحميل OpenCV و pandas عند الفتح
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    start = time.time()
+                    self._module = importlib.import_module(self._name)
+                    STARTUP.record_import(self._name, start, time.time())
+        return self._module
+
+    def __getattr__(self, attribute):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name} ({state})>"
+
+cv2 = LazyModule("cv2")
+np = LazyModule("numpy")
+pyzbar = LazyModule("pyzbar.pyzbar")
+pd = LazyModule("pandas")
+qrcode = LazyModule("qrcode")
+Image = LazyModule("PIL.Image")
+ImageDraw = LazyModule("PIL.ImageDraw")
+ImageFont = LazyModule("PIL.ImageFont")
+features = LazyModule("PIL.features")
 
-# إنشاء قاعدة البيانات
 DATABASE_FILE = "attendance.db"
 
+DAYS_MAPPING = {
+    "Saturday": "السبت",
+    "Sunday": "الأحد",
+    "Monday": "الاثنين",
+    "Tuesday": "الثلاثاء",
+    "Wednesday": "الأربعاء",
+    "Thursday": "الخميس",
+    "Friday": "الجمعة"
+}
+
+@STARTUP.profiled("create_database")
 def create_database():
     conn = sqlite3.connect(DATABASE_FILE)
     cursor = conn.cursor()
@@ -51,11 +178,126 @@ def create_database():
     conn.commit()
     conn.close()
 
-create_database()
+_bootstrapped = False
+_bootstrap_lock = threading.Lock()
+
+def bootstrap():
+    # تهيئة المجلدات وقاعدة البيانات عند تشغيل التطبيق فعلاً وليس عند استيراد الملف
+    # (عمليات ProcessPoolExecutor تستورد الملف أيضاً ولا تحتاج أياً من ذلك)
+    global _bootstrapped
+    with _bootstrap_lock:
+        if _bootstrapped:
+            return
+        os.makedirs("students", exist_ok=True)
+        os.makedirs("reports", exist_ok=True)
+        create_database()
+        _bootstrapped = True
+
+# أنماط التقارير - تُعرّف مرة واحدة وتُستخدم في كل التقارير
+REPORT_STYLES = {
+    "header": {
+        'bold': True,
+        'text_wrap': True,
+        'align': 'center',
+        'valign': 'vcenter',
+        'fg_color': '#4CAF50',
+        'border': 1,
+        'font_color': 'white'
+    },
+    "good": {'bg_color': '#C6EFCE', 'font_color': '#006100'},
+    "bad": {'bg_color': '#FFC7CE', 'font_color': '#9C0006'},
+    "summary": {'bold': True}
+}
+
+class WorkbookFormats:
+    # تنسيقات xlsxwriter لا تُنقل بين الملفات، فتُنشأ لكل ملف عند أول استخدام فقط وتُعاد بعد ذلك
+    def __init__(self, workbook):
+        self.workbook = workbook
+        self._formats = {}
+
+    def __getitem__(self, name):
+        fmt = self._formats.get(name)
+        if fmt is None:
+            fmt = self._formats[name] = self.workbook.add_format(REPORT_STYLES[name])
+        return fmt
+
+class ReportTemplate:
+    def __init__(self, sheet_name, column_widths=None, row_style=None, right_to_left=True):
+        self.sheet_name = sheet_name
+        # عرض الأعمدة حسب اسم العمود
+        self.column_widths = column_widths or {}
+        # (اسم العمود, دالة تُرجع True للصف الجيد و False للصف السيئ)
+        self.row_style = row_style
+        self.right_to_left = right_to_left
+
+    def write(self, file_path, data, summary_lines=()):
+        df = pd.DataFrame(data)
+        with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
+            df.to_excel(writer, index=False, sheet_name=self.sheet_name)
+            workbook = writer.book
+            worksheet = writer.sheets[self.sheet_name]
+            formats = WorkbookFormats(workbook)
+
+            if self.right_to_left:
+                worksheet.right_to_left()
+
+            for col_num, value in enumerate(df.columns.values):
+                worksheet.write(0, col_num, value, formats["header"])
+                if value in self.column_widths:
+                    worksheet.set_column(col_num, col_num, self.column_widths[value])
+
+            if self.row_style:
+                column, is_good = self.row_style
+                for row_num, value in enumerate(df[column].tolist(), start=1):
+                    worksheet.set_row(row_num, None, formats["good"] if is_good(value) else formats["bad"])
+
+            for offset, line in enumerate(summary_lines):
+                worksheet.write(len(df) + 2 + offset, 0, line, formats["summary"])
+
+        return file_path
+
+MONTHLY_REPORT_TEMPLATE = ReportTemplate(
+    'تقرير الحضور',
+    column_widths={"التاريخ": 14, "اليوم": 12, "الحضور": 10, "التقييم": 12, "الملاحظات": 40},
+    row_style=("الحضور", lambda value: value == 'حاضر')
+)
+
+GROUP_REPORT_TEMPLATE = ReportTemplate(
+    'تقرير المجموعة',
+    column_widths={"الطالب": 30, "الحضور (%)": 12, "الغياب (%)": 12,
+                   "الحضور (عدد)": 14, "الغياب (عدد)": 14, "متوسط التقييم": 14},
+    row_style=("الحضور (%)", lambda value: float(value.strip('%')) >= 50)
+)
+
+STUDENTS_LIST_TEMPLATE = ReportTemplate(
+    'قائمة الطلاب',
+    column_widths={"الطالب": 30, "ID": 10, "المجموعة": 20, "رقم الهاتف": 16,
+                   "عدد أيام الحضور": 16, "آخر تقييم": 12}
+)
 
 class NotificationSystem:
-    def __init__(self, page):
+    # نسخة واحدة لكل صفحة، والإشعارات المتتالية تُجمع في إشعار واحد بدلاً من تحديث الصفحة مع كل رسالة
+    _instances = weakref.WeakKeyDictionary()
+    _instances_lock = threading.Lock()
+    SEVERITY = ("info", "success", "warning", "error")
+
+    @classmethod
+    def for_page(cls, page):
+        with cls._instances_lock:
+            instance = cls._instances.get(page)
+            if instance is None:
+                instance = cls._instances[page] = cls(page)
+            return instance
+
+    def __init__(self, page, window=0.15, min_interval=0.5, max_lines=3):
         self.page = page
+        self.window = window
+        self.min_interval = min_interval
+        self.max_lines = max_lines
+        self._queue = []
+        self._lock = threading.Lock()
+        self._timer = None
+        self._last_flush = 0.0
         self.icon_map = {
             "success": ft.icons.CHECK_CIRCLE,
             "error": ft.icons.ERROR,
@@ -82,27 +324,55 @@ class NotificationSystem:
         
         self.page.dialog = notification
         notification.open = True
-        self.page.update()
+        UpdateScheduler.for_page(self.page).flush_now()
         
         if duration > 0:
             def close_after_delay():
                 time.sleep(duration/1000)
                 if notification.open:
                     notification.open = False
-                    self.page.update()
+                    UpdateScheduler.for_page(self.page).flush_now()
             
             threading.Thread(target=close_after_delay, daemon=True).start()
     
     def close_notification(self):
         if self.page.dialog:
             self.page.dialog.open = False
-            self.page.update()
+            UpdateScheduler.for_page(self.page).flush_now()
     
     def show_toast(self, message, notification_type="info"):
+        # آمنة من أي خيط: الرسالة تدخل الطابور ويُعرض الطابور كله بعد فترة قصيرة
+        with self._lock:
+            self._queue.append((message, notification_type))
+            if self._timer is None:
+                delay = max(self.window, self._last_flush + self.min_interval - time.monotonic())
+                self._timer = threading.Timer(delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            queue, self._queue = self._queue, []
+            self._last_flush = time.monotonic()
+        if not queue:
+            return
+
+        # الرسائل الأخطر أولاً ثم الأحدث، واللون والأيقونة حسب أخطر رسالة
+        severity = lambda t: self.SEVERITY.index(t) if t in self.SEVERITY else 0
+        ordered = sorted(reversed(queue), key=lambda item: -severity(item[1]))
+        notification_type = ordered[0][1]
+        messages = list(dict.fromkeys(message for message, _ in ordered))
+        lines = [ft.Text(message) for message in messages[:self.max_lines]]
+        if len(queue) > len(lines):
+            lines.append(ft.Text(f"و {len(queue) - len(lines)} إشعارات أخرى", size=12))
+
         self.page.snack_bar = ft.SnackBar(
             content=ft.Row([
                 ft.Icon(self.icon_map.get(notification_type, ft.icons.INFO)),
-                ft.Text(message)
+                lines[0] if len(lines) == 1 else ft.Column(lines, spacing=2, tight=True)
             ]),
             bgcolor=self.color_map.get(notification_type, ft.colors.BLUE),
             duration=3000,
@@ -111,7 +381,159 @@ class NotificationSystem:
             shape=ft.RoundedRectangleBorder(radius=10)
         )
         self.page.snack_bar.open = True
-        self.page.update()
+        UpdateScheduler.for_page(self.page).mark_dirty()
+
+class UpdateScheduler:
+    # يجمع تحديثات الواجهة ويرسلها دفعة واحدة كل إطار بدلاً من page.update() بعد كل تغيير
+    _instances = weakref.WeakKeyDictionary()
+    _instances_lock = threading.Lock()
+
+    @classmethod
+    def for_page(cls, page):
+        with cls._instances_lock:
+            instance = cls._instances.get(page)
+            if instance is None:
+                instance = cls._instances[page] = cls(page)
+            return instance
+
+    def __init__(self, page, interval=1 / 30):
+        self.page = page
+        self.interval = interval
+        self.flushes = 0
+        self._dirty = {}
+        self._full = False
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def _mark(self, controls):
+        # بدون عناصر = تحديث الصفحة كلها (نوافذ الحوار، snack bar، تغيير المسار)
+        if controls:
+            for control in controls:
+                self._dirty[id(control)] = control
+        else:
+            self._full = True
+
+    def mark_dirty(self, *controls):
+        with self._lock:
+            self._mark(controls)
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush_now(self, *controls):
+        # للمسارات الحرجة: فتح/إغلاق نافذة أو التنقل يجب أن يظهر فوراً
+        with self._lock:
+            self._mark(controls)
+        self.flush()
+
+    def flush(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            dirty, full = list(self._dirty.values()), self._full
+            self._dirty, self._full = {}, False
+        if not dirty and not full:
+            return
+
+        self.flushes += 1
+        try:
+            if full:
+                self.page.update()
+            else:
+                self.page.update(*dirty)
+        except Exception as e:
+            print(f"Error updating page: {str(e)}")
+
+def render_qr_image(payload):
+    qr = qrcode.QRCode(version=1, box_size=10, border=5)
+    qr.add_data(str(payload))
+    qr.make(fit=True)
+    return qr.make_image(fill_color="black", back_color="white")
+
+class QRCodeCache:
+    # صور QR تُولد عند الحاجة فقط: ذاكرة LRU محدودة + ملفات على القرص باسم ID الطالب وبصمة المحتوى
+    def __init__(self, directory="students/qr", capacity=256):
+        self.directory = directory
+        self.capacity = capacity
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def payload(student):
+        return QRCodeCache.payload_for(student.id)
+
+    @staticmethod
+    def payload_for(student_id):
+        return str(student_id)
+
+    def path(self, student):
+        return self.path_for(student.id)
+
+    def path_for(self, student_id):
+        digest = hashlib.sha1(self.payload_for(student_id).encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.directory, f"{student_id}_{digest}.png")
+
+    def _remember(self, path, data):
+        with self._lock:
+            self._memory[path] = data
+            self._memory.move_to_end(path)
+            while len(self._memory) > self.capacity:
+                self._memory.popitem(last=False)
+
+    def put(self, student_id, png_bytes):
+        # حفظ صورة QR جاهزة (مثلاً من عمليات التوليد المتوازي) في القرص والذاكرة، ويُرجع مسارها
+        path = self.path_for(student_id)
+        self._store(student_id, path, png_bytes)
+        self._remember(path, png_bytes)
+        return path
+
+    def _store(self, student_id, path, data):
+        os.makedirs(self.directory, exist_ok=True)
+        # ملف مؤقت خاص بكل كاتب (عملية + خيط) حتى لا يكتب خيطان في نفس الملف لنفس الطالب
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+        # حذف الصور القديمة لنفس الطالب إذا تغير محتوى الكود، دون لمس ملفات .tmp لكاتب آخر لم ينتهِ بعد
+        prefix = f"{student_id}_"
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and name.endswith(".png") and os.path.join(self.directory, name) != path:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def get_png(self, student):
+        path = self.path(student)
+        with self._lock:
+            data = self._memory.get(path)
+            if data is not None:
+                self._memory.move_to_end(path)
+                return data
+
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                data = f.read()
+        else:
+            buffer = io.BytesIO()
+            render_qr_image(self.payload(student)).save(buffer)
+            data = buffer.getvalue()
+            self._store(student.id, path, data)
+        self._remember(path, data)
+        return data
+
+    def get_path(self, student):
+        path = self.path(student)
+        if not os.path.exists(path):
+            self.get_png(student)
+        return path
+
+    def get_base64(self, student):
+        return base64.b64encode(self.get_png(student)).decode("ascii")
+
+QR_CACHE = QRCodeCache()
 
 class Student:
     def __init__(self, name, phone, group):
@@ -122,16 +544,25 @@ class Student:
         self.attendance = []
         self.evaluation = {}
 
+    def replace(self, **changes):
+        # نسخة جديدة بالتعديلات: الكائن المنشور لا يُعدَّل حتى لا يرى القارئ بدون قفل حقولاً نصف محدثة
+        student = Student(self.name, self.phone, self.group)
+        student.id = self.id
+        student.attendance = self.attendance
+        student.evaluation = self.evaluation
+        student.__dict__.update(changes)
+        return student
+
+    @property
+    def qr_path(self):
+        return QR_CACHE.path(self)
+
     def generate_qr_code(self, page):
         try:
-            qr = qrcode.QRCode(version=1, box_size=10, border=5)
-            qr.add_data(str(self.id))
-            qr.make(fit=True)
-            img = qr.make_image(fill_color="black", back_color="white")
-            img.save(f"students/{self.name}_QR.png")
-            NotificationSystem(page).show_toast(f"تم إنشاء QR Code للطالب {self.name}", "success")
+            return QR_CACHE.get_path(self)
         except Exception as e:
-            NotificationSystem(page).show_toast(f"خطأ في إنشاء QR Code: {str(e)}", "error")
+            NotificationSystem.for_page(page).show_toast(f"خطأ في إنشاء QR Code: {str(e)}", "error")
+            return None
 
 class Group:
     def __init__(self, name, time, days):
@@ -141,278 +572,1572 @@ class Group:
         self.students = []
 
     def add_student(self, student, page):
-        self.students.append(student)
-        NotificationSystem(page).show_toast(f"تمت إضافة الطالب {student.name} إلى المجموعة {self.name}", "success")
+        self.students = self.students + [student]
+        NotificationSystem.for_page(page).show_toast(f"تمت إضافة الطالب {student.name} إلى المجموعة {self.name}", "success")
 
     def remove_student(self, student_id, page):
         for student in self.students:
             if student.id == student_id:
-                self.students.remove(student)
-                NotificationSystem(page).show_toast(f"تم حذف الطالب {student.name} من المجموعة {self.name}", "success")
+                self.students = [s for s in self.students if s is not student]
+                NotificationSystem.for_page(page).show_toast(f"تم حذف الطالب {student.name} من المجموعة {self.name}", "success")
                 return
-        NotificationSystem(page).show_toast("الطالب غير موجود في هذه المجموعة.", "error")
+        NotificationSystem.for_page(page).show_toast("الطالب غير موجود في هذه المجموعة.", "error")
 
-class AttendanceSystem:
+class CaptureSource:
+    # واجهة مصدر الإطارات: كاميرا، ملف فيديو/صورة، أو مصدر صناعي للاختبار
+    def open(self):
+        return True
+
+    def read(self):
+        return False, None
+
+    def release(self):
+        pass
+
+    def close(self):
+        self.release()
+
+class OpenCVCameraSource(CaptureSource):
+    def __init__(self, index=0, backend=None):
+        self.index = index
+        self.backend = backend if backend is not None else self.default_backend()
+        self.cap = None
+
+    @staticmethod
+    def default_backend():
+        if sys.platform.startswith("win"):
+            return cv2.CAP_DSHOW
+        if sys.platform == "darwin":
+            return cv2.CAP_AVFOUNDATION
+        if sys.platform.startswith("linux"):
+            return cv2.CAP_V4L2
+        return cv2.CAP_ANY
+
+    def open(self):
+        if self.cap is not None and self.cap.isOpened():
+            return True
+        self.cap = cv2.VideoCapture(self.index, self.backend)
+        if not self.cap.isOpened() and self.backend != cv2.CAP_ANY:
+            self.cap.release()
+            self.cap = cv2.VideoCapture(self.index, cv2.CAP_ANY)
+        return self.cap.isOpened()
+
+    def read(self):
+        if self.cap is None:
+            return False, None
+        return self.cap.read()
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+class CameraBusyError(RuntimeError):
+    pass
+
+class CameraSession(CaptureSource):
+    # جلسة كاميرا دافئة: تبقى مفتوحة بين عمليات المسح وتُغلق بعد فترة خمول
+    # ماسح واحد فقط يأخذها في كل مرة، وكل لمس للجهاز (فتح/قراءة/إغلاق) يتم تحت _lock
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, source=None, idle_timeout=300):
+        self.source = source or OpenCVCameraSource()
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle_timer = None
+        self._opened = False
+        self._in_use = False
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _cancel_idle_timer(self):
+        if self._idle_timer:
+            self._idle_timer.cancel()
+            self._idle_timer = None
+
+    @property
+    def in_use(self):
+        return self._in_use
+
+    def open(self):
+        with self._lock:
+            if self._in_use:
+                # ماسح آخر (نافذة أخرى أو وضع المسح المستمر) يقرأ من الكاميرا الآن
+                raise CameraBusyError("camera session is already in use")
+            self._cancel_idle_timer()
+            if not self._opened:
+                self._opened = self.source.open()
+                if not self._opened:
+                    self.source.release()
+            elif hasattr(self.source, "cap"):
+                # تجاهل الإطار القديم المخزن في الكاميرا منذ آخر مسح
+                self.source.cap.grab()
+            self._in_use = self._opened
+            return self._opened
+
+    def read(self):
+        with self._lock:
+            if not self._in_use:
+                return False, None
+            return self.source.read()
+
+    def release(self):
+        # إنهاء استخدام الجلسة فقط؛ الجهاز يبقى مفتوحاً حتى انتهاء مدة الخمول
+        with self._lock:
+            if not self._in_use:
+                return
+            self._in_use = False
+            self._cancel_idle_timer()
+            if self._opened and self.idle_timeout:
+                self._idle_timer = threading.Timer(self.idle_timeout, self._expire)
+                self._idle_timer.daemon = True
+                self._idle_timer.start()
+
+    def _expire(self):
+        # يُغلق الجهاز تحت نفس القفل، فلا يمكن أن يتزامن مع ماسح أخذ الجلسة قبل انتهاء المؤقت مباشرة
+        with self._lock:
+            self._idle_timer = None
+            if not self._in_use:
+                self._close_device()
+
+    def _close_device(self):
+        self.source.release()
+        self._opened = False
+
+    def close(self):
+        with self._lock:
+            self._cancel_idle_timer()
+            self._in_use = False
+            self._close_device()
+
+class FileSource(CaptureSource):
+    IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff")
+
+    def __init__(self, path, loop=False, realtime=False):
+        self.path = path
+        self.loop = loop
+        self.realtime = realtime
+        self.cap = None
+        self.image = None
+        self._frame_interval = 0
+        self._last_read = 0
+
+    @property
+    def is_image(self):
+        return self.path.lower().endswith(self.IMAGE_EXTENSIONS)
+
+    def open(self):
+        if self.is_image:
+            self.image = cv2.imread(self.path)
+            self._served = False
+            return self.image is not None
+        self.cap = cv2.VideoCapture(self.path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS) or 0
+        self._frame_interval = 1.0 / fps if self.realtime and fps > 0 else 0
+        return self.cap.isOpened()
+
+    def read(self):
+        if self.image is not None:
+            if self._served and not self.loop:
+                return False, None
+            self._served = True
+            return True, self.image
+        if self.cap is None:
+            return False, None
+        if self._frame_interval:
+            delay = self._last_read + self._frame_interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._last_read = time.monotonic()
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        self.image = None
+
+class SyntheticQRSource(CaptureSource):
+    # يولد إطارات تحتوي على QR Codes باستخدام مكتبة qrcode لاختبار المسح بدون كاميرا
+    def __init__(self, payloads, size=(640, 480), frames_per_code=10, blank_frames=5, fps=0, loop=False):
+        self.payloads = [str(p) for p in payloads]
+        self.size = size
+        self.frames_per_code = frames_per_code
+        self.blank_frames = blank_frames
+        self.fps = fps
+        self.loop = loop
+        self._frames = []
+        self._position = 0
+
+    def _render(self, payload):
+        width, height = self.size
+        frame = np.full((height, width, 3), 255, dtype=np.uint8)
+        qr = qrcode.QRCode(box_size=4, border=4)
+        qr.add_data(payload)
+        qr.make(fit=True)
+        code = np.array(qr.make_image(fill_color="black", back_color="white").convert("L"), dtype=np.uint8)
+        side = min(code.shape[0], height, width)
+        code = cv2.resize(code, (side, side), interpolation=cv2.INTER_NEAREST)
+        top, left = (height - side) // 2, (width - side) // 2
+        frame[top:top + side, left:left + side] = code[:, :, None]
+        return frame
+
+    def open(self):
+        width, height = self.size
+        blank = np.full((height, width, 3), 255, dtype=np.uint8)
+        self._frames = []
+        for payload in self.payloads:
+            self._frames.extend([self._render(payload)] * self.frames_per_code)
+            self._frames.extend([blank] * self.blank_frames)
+        self._position = 0
+        return bool(self._frames)
+
+    def read(self):
+        if self._position >= len(self._frames):
+            if not self.loop or not self._frames:
+                return False, None
+            self._position = 0
+        if self.fps:
+            time.sleep(1.0 / self.fps)
+        frame = self._frames[self._position]
+        self._position += 1
+        return True, frame
+
+    def release(self):
+        self._frames = []
+
+def benchmark_scanner(source, max_frames=300):
+    # قياس أداء فك الترميز على أي مصدر إطارات (بدون واجهة)
+    decoder = QRDecoder()
+    codes = set()
+    if not source.open():
+        return None
+    start = time.perf_counter()
+    try:
+        for _ in range(max_frames):
+            ret, frame = source.read()
+            if not ret:
+                break
+            codes.update(barcode.data.decode("utf-8") for barcode in decoder.decode(frame))
+    finally:
+        source.close()
+    elapsed = time.perf_counter() - start
+    stats = dict(decoder.stats)
+    stats["fps"] = round(stats["frames"] / elapsed, 1) if elapsed else 0
+    stats["codes"] = sorted(codes)
+    return stats
+
+def _decode_codes(frame):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return {barcode.data.decode("utf-8", errors="replace")
+            for barcode in pyzbar.decode(gray, symbols=[pyzbar.ZBarSymbol.QRCODE])}
+
+def _decode_image_task(path):
+    frame = cv2.imread(path)
+    return _decode_codes(frame) if frame is not None else set()
+
+def _decode_video_task(path, start, end, stride):
+    codes = set()
+    cap = cv2.VideoCapture(path)
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        for index in range(start, end):
+            # grab() أسرع من read() للإطارات التي لن تُفك
+            if (index - start) % stride:
+                if not cap.grab():
+                    break
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            codes |= _decode_codes(frame)
+    finally:
+        cap.release()
+    return codes
+
+def collect_codes_from_media(paths, stride=5, workers=None):
+    # فك كل الأكواد الظاهرة في صور أو مقاطع فيديو بالتوازي على أنوية المعالج
+    workers = workers or os.cpu_count() or 1
+    tasks = []
+    for path in paths:
+        if path.lower().endswith(FileSource.IMAGE_EXTENSIONS):
+            tasks.append((_decode_image_task, (path,)))
+            continue
+        cap = cv2.VideoCapture(path)
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        cap.release()
+        if frame_count <= 0:
+            continue
+        chunk = max(stride, -(-frame_count // workers))
+        chunk += -chunk % stride
+        for start in range(0, frame_count, chunk):
+            tasks.append((_decode_video_task, (path, start, min(start + chunk, frame_count), stride)))
+
+    return set().union(*run_parallel(tasks, workers))
+
+def run_parallel(tasks, workers=None):
+    # تنفيذ [(دالة, معاملات)] في عمليات متعددة، مع الرجوع للخيوط إذا لم تكن مدعومة
+    if not tasks:
+        return []
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+
+    def run(executor_factory):
+        with executor_factory() as executor:
+            futures = [executor.submit(function, *args) for function, args in tasks]
+            return [future.result() for future in futures]
+
+    try:
+        # spawn وليس fork: العملية الحالية فيها خيوط Flet والكاميرا و OpenCV، ونسخها بـ fork قد يورث
+        # قفلاً محجوزاً فيتجمد الابن. لذلك يجب أن تبقى دوال المهام على مستوى الملف ليستوردها الابن
+        context = multiprocessing.get_context("spawn")
+        return run(lambda: ProcessPoolExecutor(max_workers=workers, mp_context=context))
+    except (NotImplementedError, OSError, ImportError, BrokenExecutor) as e:
+        # بعض المنصات (مثل أندرويد) لا تدعم العمليات المتعددة
+        print(f"Process pool unavailable, using threads: {str(e)}")
+        return run(lambda: ThreadPoolExecutor(max_workers=workers))
+
+def _render_qr_task(payload):
+    buffer = io.BytesIO()
+    render_qr_image(payload).save(buffer)
+    return buffer.getvalue()
+
+def generate_qr_batch(students, workers=None):
+    # يولد صور QR الناقصة في ذاكرة التخزين المؤقت بالتوازي؛ الصور المحدثة (نفس البصمة) تُتخطى
+    pending = [student for student in students if not os.path.exists(QR_CACHE.path(student))]
+    tasks = [(_render_qr_task, (QR_CACHE.payload(student),)) for student in pending]
+    for student, data in zip(pending, run_parallel(tasks, workers)):
+        QR_CACHE.put(student.id, data)
+    return {student.id: QR_CACHE.path(student) for student in students}, len(pending)
+
+_shaping_warned = False
+
+def arabic_shaping_available():
+    # Pillow مع raqm يشكّل النص بنفسه، وإلا نحتاج arabic-reshaper و python-bidi (في requirements.txt)
+    if features.check_feature("raqm"):
+        return True
+    return all(importlib.util.find_spec(name) for name in ("arabic_reshaper", "bidi"))
+
+def _shape_text(text):
+    global _shaping_warned
+    if features.check_feature("raqm"):
+        return text
+    try:
+        import arabic_reshaper
+        from bidi.algorithm import get_display
+        return get_display(arabic_reshaper.reshape(text))
+    except ImportError:
+        if not _shaping_warned:
+            _shaping_warned = True
+            print("Warning: Arabic text on QR cards will be unshaped and reversed: "
+                  "Pillow has no raqm and arabic-reshaper/python-bidi are not installed "
+                  "(pip install arabic-reshaper python-bidi)")
+        return text
+
+def _load_card_font(size):
+    for name in ("arial.ttf", "tahoma.ttf", "DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
+
+def compose_card_sheets(students, qr_paths, output_base, columns=3, rows=4, dpi=150):
+    # صفحات A4 تحتوي على بطاقات QR مع الاسم والـ ID والمجموعة تحت كل كود
+    page_width, page_height = int(8.27 * dpi), int(11.69 * dpi)
+    margin = dpi // 3
+    cell_width = (page_width - 2 * margin) // columns
+    cell_height = (page_height - 2 * margin) // rows
+    qr_size = min(cell_width, cell_height) - dpi // 2
+    font = _load_card_font(dpi // 7)
+    line_height = getattr(font, "size", 10) + 4
+    per_page = columns * rows
+
+    sheets = []
+    for start in range(0, len(students), per_page):
+        sheet = Image.new("RGB", (page_width, page_height), "white")
+        draw = ImageDraw.Draw(sheet)
+        for index, student in enumerate(students[start:start + per_page]):
+            left = margin + (index % columns) * cell_width
+            top = margin + (index // columns) * cell_height
+            draw.rectangle([left + 4, top + 4, left + cell_width - 4, top + cell_height - 4], outline="#BBBBBB")
+            with Image.open(qr_paths[student.id]) as qr_image:
+                code = qr_image.convert("RGB").resize((qr_size, qr_size), Image.NEAREST)
+            sheet.paste(code, (left + (cell_width - qr_size) // 2, top + 8))
+            text_top = top + 8 + qr_size
+            for line in (student.name, f"ID: {student.id}", student.group):
+                line = _shape_text(line)
+                text_width = draw.textlength(line, font=font)
+                draw.text((left + (cell_width - text_width) / 2, text_top), line, fill="black", font=font)
+                text_top += line_height
+        sheets.append(sheet)
+
+    if not sheets:
+        return []
+    paths = []
+    for number, sheet in enumerate(sheets, start=1):
+        path = f"{output_base}_{number}.png"
+        sheet.save(path, dpi=(dpi, dpi))
+        paths.append(path)
+    pdf_path = f"{output_base}.pdf"
+    sheets[0].save(pdf_path, save_all=True, append_images=sheets[1:], resolution=dpi)
+    paths.insert(0, pdf_path)
+    return paths
+
+class LatestFrameBuffer:
+    # مخزن بإطار واحد فقط: الإطار الجديد يستبدل القديم الذي لم يُعالج بعد
     def __init__(self):
+        self._condition = threading.Condition()
+        self._frame = None
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._condition:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        with self._condition:
+            if self._frame is None:
+                self._condition.wait(timeout)
+            frame, self._frame = self._frame, None
+            return frame
+
+class QRDecoder:
+    # واجهة أمامية لـ pyzbar: رمادي + تصغير + منطقة آخر قراءة، ثم الدقة الكاملة عند الفشل
+    def __init__(self, target_width=640, roi_margin=0.5, frame_budget=0.04, full_res_interval=5):
+        self.target_width = target_width
+        self.roi_margin = roi_margin
+        self.frame_budget = frame_budget
+        self.full_res_interval = full_res_interval
+        self.last_hit = None
+        self._avg_time = 0.0
+        self._frame_counter = 0
+        self._misses = 0
+        self.stats = {
+            "frames": 0,
+            "decoded": 0,
+            "skipped": 0,
+            "roi_hits": 0,
+            "fast_hits": 0,
+            "full_hits": 0,
+            "last_ms": 0.0,
+            "avg_ms": 0.0
+        }
+
+    def should_skip(self):
+        # عند انشغال المعالج نعالج إطاراً واحداً من كل عدة إطارات
+        self._frame_counter += 1
+        stride = max(1, int(self._avg_time / self.frame_budget)) if self.frame_budget else 1
+        if self._frame_counter % stride:
+            self.stats["skipped"] += 1
+            return True
+        return False
+
+    def _decode(self, image, scale=1.0, offset=(0, 0)):
+        barcodes = pyzbar.decode(image, symbols=[pyzbar.ZBarSymbol.QRCODE])
+        if scale == 1.0 and offset == (0, 0):
+            return barcodes
+        dx, dy = offset
+        return [
+            barcode._replace(
+                rect=barcode.rect._replace(
+                    left=int(barcode.rect.left * scale) + dx,
+                    top=int(barcode.rect.top * scale) + dy,
+                    width=int(barcode.rect.width * scale),
+                    height=int(barcode.rect.height * scale)
+                ),
+                polygon=[p._replace(x=int(p.x * scale) + dx, y=int(p.y * scale) + dy) for p in barcode.polygon]
+            )
+            for barcode in barcodes
+        ]
+
+    def _roi(self, gray):
+        left, top, width, height = self.last_hit
+        margin_x = int(width * self.roi_margin)
+        margin_y = int(height * self.roi_margin)
+        x0, y0 = max(0, left - margin_x), max(0, top - margin_y)
+        x1 = min(gray.shape[1], left + width + margin_x)
+        y1 = min(gray.shape[0], top + height + margin_y)
+        return gray[y0:y1, x0:x1], (x0, y0)
+
+    def decode(self, frame):
+        start = time.perf_counter()
+        self.stats["frames"] += 1
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        barcodes = []
+        path = None
+
+        if self.last_hit:
+            roi, offset = self._roi(gray)
+            if roi.size:
+                barcodes = self._decode(roi, offset=offset)
+                path = "roi_hits"
+
+        if not barcodes:
+            scale = gray.shape[1] / self.target_width if gray.shape[1] > self.target_width else 1.0
+            small = gray
+            if scale > 1.0:
+                small = cv2.resize(gray, (self.target_width, int(gray.shape[0] / scale)),
+                                   interpolation=cv2.INTER_AREA)
+            barcodes = self._decode(small, scale=scale)
+            path = "fast_hits"
+
+            if not barcodes and scale > 1.0:
+                self._misses += 1
+                if self._misses % self.full_res_interval == 0:
+                    barcodes = self._decode(gray)
+                    path = "full_hits"
+
+        if barcodes:
+            self._misses = 0
+            self.last_hit = tuple(barcodes[0].rect)
+            self.stats["decoded"] += 1
+            self.stats[path] += 1
+        else:
+            self.last_hit = None
+
+        elapsed = time.perf_counter() - start
+        self._avg_time = elapsed if not self._avg_time else self._avg_time * 0.9 + elapsed * 0.1
+        self.stats["last_ms"] = round(elapsed * 1000, 2)
+        self.stats["avg_ms"] = round(self._avg_time * 1000, 2)
+        return barcodes
+
+class PreviewEncoder:
+    # معاينة مصغرة بصيغة JPEG داخل نافذة المسح، بمعدل مستقل عن معدل فك الترميز
+    def __init__(self, width=320, fps=8, quality=60, box_ttl=0.5):
+        self.width = width
+        self.fps = fps
+        self.quality = quality
+        self.box_ttl = box_ttl
+        self._last_frame_time = 0
+        self._boxes = []
+        self._boxes_time = 0
+
+    def set_barcodes(self, barcodes):
+        self._boxes = [barcode.polygon for barcode in barcodes]
+        self._boxes_time = time.monotonic()
+
+    def due(self):
+        now = time.monotonic()
+        if now - self._last_frame_time < 1.0 / self.fps:
+            return False
+        self._last_frame_time = now
+        return True
+
+    def encode(self, frame):
+        scale = self.width / frame.shape[1]
+        small = cv2.resize(frame, (self.width, int(frame.shape[0] * scale)), interpolation=cv2.INTER_AREA)
+        if self._boxes and time.monotonic() - self._boxes_time < self.box_ttl:
+            for polygon in self._boxes:
+                points = np.array([(p.x * scale, p.y * scale) for p in polygon], dtype=np.int32)
+                cv2.polylines(small, [points], True, (0, 200, 0), 2)
+        ok, buffer = cv2.imencode(".jpg", small, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        return base64.b64encode(buffer).decode("ascii") if ok else None
+
+    def placeholder(self):
+        return self.encode(np.zeros((self.width * 3 // 4, self.width, 3), dtype=np.uint8))
+
+class ScannerPipeline:
+    def __init__(self, cap, on_result, on_error=None, on_preview=None, decoder=None, preview=None):
+        self.cap = cap
+        self.on_result = on_result
+        self.on_error = on_error
+        self.on_preview = on_preview
+        self.decoder = decoder or QRDecoder()
+        self.preview = preview or PreviewEncoder()
+        self.frames = LatestFrameBuffer()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    @property
+    def running(self):
+        return not self._stop_event.is_set()
+
+    def start(self):
+        self._threads = [
+            threading.Thread(target=self._capture_loop, daemon=True),
+            threading.Thread(target=self._decode_loop, daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def join(self, timeout=None):
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+
+    def _report_error(self, message):
+        self.stop()
+        if self.on_error:
+            self.on_error(message)
+
+    def _capture_loop(self):
+        try:
+            while self.running:
+                ret, frame = self.cap.read()
+                if not ret:
+                    self._report_error("تعذر قراءة الصورة من الكاميرا!")
+                    break
+                self.frames.put(frame)
+
+                if self.on_preview and self.preview.due():
+                    image = self.preview.encode(frame)
+                    if image:
+                        self.on_preview(image)
+        except Exception as e:
+            self._report_error(f"خطأ في مسح QR Code: {str(e)}")
+        finally:
+            # الكاميرا تُغلق من نفس الخيط الذي يقرأ منها
+            self.cap.release()
+
+    def _decode_loop(self):
+        while self.running:
+            frame = self.frames.get(timeout=0.1)
+            if frame is None or self.decoder.should_skip():
+                continue
+            try:
+                barcodes = self.decoder.decode(frame)
+            except Exception as e:
+                self._report_error(f"خطأ في مسح QR Code: {str(e)}")
+                break
+            if barcodes and self.running:
+                self.preview.set_barcodes(barcodes)
+                self.on_result(barcodes)
+
+class ScanDeduplicator:
+    # يتجاهل تكرار قراءة نفس الكود خلال مدة صلاحية (ttl) بالثواني
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._expires = {}
+
+    def accept(self, code, now=None):
+        now = time.monotonic() if now is None else now
+        if self._expires.get(code, 0) > now:
+            return False
+        if len(self._expires) > 256:
+            self._expires = {c: t for c, t in self._expires.items() if t > now}
+        self._expires[code] = now + self.ttl
+        return True
+
+ARABIC_NORMALIZATION = str.maketrans({
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ة": "ه", "ى": "ي", "ؤ": "و", "ئ": "ي",
+    "٠": "0", "١": "1", "٢": "2", "٣": "3", "٤": "4",
+    "٥": "5", "٦": "6", "٧": "7", "٨": "8", "٩": "9",
+    "\u0640": None,
+    **{chr(c): None for c in range(0x064B, 0x0653)},
+    "\u0670": None
+})
+
+def normalize_text(text):
+    return " ".join(str(text).translate(ARABIC_NORMALIZATION).lower().split())
+
+def collation_key(text):
+    # بعد التطبيع (توحيد الألف والتاء المربوطة والياء) يصبح ترتيب نقاط Unicode العربية هو الترتيب الأبجدي
+    return normalize_text(text), str(text)
+
+TIME_PATTERN = re.compile(r"(\d{1,2})(?::(\d{2}))?")
+
+def time_sort_key(text):
+    # "4:30 مساءً" و"16:30" لهما نفس المفتاح، والمواعيد غير المفهومة تأتي في النهاية مرتبة أبجدياً
+    normalized = normalize_text(text)
+    match = TIME_PATTERN.search(normalized)
+    if not match:
+        return 1, 0, normalized
+    hour, minute = int(match.group(1)) % 24, int(match.group(2) or 0)
+    if hour < 12 and ("مساء" in normalized or "pm" in normalized or re.search(r"(^|\s)م($|\s)", normalized)):
+        hour += 12
+    return 0, hour * 60 + minute, normalized
+
+def last_rating(student):
+    if not student.evaluation:
+        return 0
+    return int(student.evaluation[max(student.evaluation)].get("stars", 0))
+
+STUDENT_SORT_KEYS = {
+    "id": lambda s: s.id,
+    "name": lambda s: collation_key(s.name),
+    "group": lambda s: collation_key(s.group),
+    "attendance": lambda s: len(s.attendance),
+    "rating": last_rating
+}
+
+GROUP_SORT_KEYS = {
+    "name": lambda g: collation_key(g.name),
+    "time": lambda g: time_sort_key(g.time)
+}
+
+class StudentSearchIndex:
+    # فهرس بحث: أزواج الحروف (bigrams) للاسم والمجموعة + بادئات الـ ID، يُحدّث مع كل إضافة/تعديل/حذف
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._texts = {}
+        self._grams = {}
+        self._id_prefixes = {}
+
+    @staticmethod
+    def _grams_of(text):
+        grams = set(text)
+        grams.update(text[i:i + 2] for i in range(len(text) - 1))
+        return grams
+
+    @staticmethod
+    def _key(student):
+        return student.id
+
+    @staticmethod
+    def _text(student):
+        return f"{student.name} {student.group}"
+
+    def _add(self, item):
+        key = self._key(item)
+        text = normalize_text(self._text(item))
+        self._texts[key] = text
+        for gram in self._grams_of(text):
+            self._grams.setdefault(gram, set()).add(key)
+        if isinstance(key, int):
+            prefix_key = str(key)
+            for i in range(1, len(prefix_key) + 1):
+                self._id_prefixes.setdefault(prefix_key[:i], set()).add(key)
+
+    def _remove(self, key):
+        text = self._texts.pop(key, None)
+        if text is None:
+            return
+        for gram in self._grams_of(text):
+            keys = self._grams.get(gram)
+            if keys:
+                keys.discard(key)
+                if not keys:
+                    del self._grams[gram]
+        if isinstance(key, int):
+            prefix_key = str(key)
+            for i in range(1, len(prefix_key) + 1):
+                keys = self._id_prefixes.get(prefix_key[:i])
+                if keys:
+                    keys.discard(key)
+                    if not keys:
+                        del self._id_prefixes[prefix_key[:i]]
+
+    def rebuild(self, items):
+        with self._lock:
+            self._texts, self._grams, self._id_prefixes = {}, {}, {}
+            for item in items:
+                self._add(item)
+
+    def add(self, item):
+        with self._lock:
+            self._add(item)
+
+    def update(self, item, old_key=None):
+        with self._lock:
+            self._remove(self._key(item) if old_key is None else old_key)
+            self._add(item)
+
+    def remove(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def search(self, query):
+        query = normalize_text(query)
+        if not query:
+            return None
+        with self._lock:
+            matches = None
+            for token in query.split():
+                grams = [token] if len(token) == 1 else [token[i:i + 2] for i in range(len(token) - 1)]
+                candidates = None
+                # نبدأ بأصغر مجموعة لتقليل تكلفة التقاطع
+                for ids in sorted((self._grams.get(gram, set()) for gram in grams), key=len):
+                    candidates = set(ids) if candidates is None else candidates & ids
+                    if not candidates:
+                        break
+                candidates = {i for i in candidates or () if token in self._texts[i]}
+                matches = candidates if matches is None else matches & candidates
+            if query.isdigit():
+                matches |= self._id_prefixes.get(query, set())
+            return matches
+
+class GroupSearchIndex(StudentSearchIndex):
+    # نفس الفهرس لكن على اسم المجموعة ووقتها وأيامها، والمفتاح هو اسم المجموعة
+    @staticmethod
+    def _key(group):
+        return group.name
+
+    @staticmethod
+    def _text(group):
+        return f"{group.name} {group.time} {group.days}"
+
+def synchronized(method):
+    # الكتابة تمر عبر قفل واحد للكاتب، والقراءة تتم بدون قفل على لقطات غير قابلة للتعديل
+    # الأحداث التي تُطلق أثناء الكتابة تُجمع، وتُرسل للمستمعين بعد تحرير القفل الخارجي
+    # حتى لا تُوقف واجهة جلسة بطيئة كل الكُتّاب في الجلسات الأخرى
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        events = []
+        try:
+            with self._write_lock:
+                self._lock_depth += 1
+                try:
+                    return method(self, *args, **kwargs)
+                finally:
+                    self._lock_depth -= 1
+                    if self._lock_depth == 0:
+                        events, self._pending_events = self._pending_events, []
+        finally:
+            self._dispatch(events)
+    return wrapper
+
+def in_executor(method):
+    # نسخة async من عملية تلمس القرص أو المعالج، تُنفَّذ في executor النظام حتى لا تُوقف حلقة أحداث Flet
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(method, self, *args, **kwargs))
+    wrapper.__name__ = f"{method.__name__}_async"
+    return wrapper
+
+class AttendanceSystem:
+    # نموذج التزامن: كل تعديل يتم تحت _write_lock ويستبدل القوائم بنسخ جديدة (copy-on-write)
+    # بدلاً من تعديلها في مكانها، لذلك يمكن لأي خيط قراءة students/groups دون قفل
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, background=False):
+        self._write_lock = threading.RLock()
+        self._lock_depth = 0
+        self._pending_events = []
+        self._db_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="attendance")
         self.groups = []
         self.students = []
+        # فهارس في الذاكرة للبحث السريع بدلاً من المرور على القوائم
+        self.students_by_id = {}
+        self.groups_by_name = {}
+        self.search_index = StudentSearchIndex()
+        self.group_index = GroupSearchIndex()
+        # ترتيبات محسوبة مسبقاً: (النوع، الأعمدة) -> (القائمة المصدر، القائمة المرتبة)
+        self._sort_cache = {}
+        self.listeners = []
         self.notification = None
-        self.load_data()
+        # ready يُضبط عند اكتمال load_data؛ الحضور اليدوي قبلها يُكتب مباشرة في القاعدة ويُحفظ في _pending_attendance
+        self.ready = threading.Event()
+        self._pending_lock = threading.Lock()
+        self._pending_attendance = []
+        if background:
+            # الواجهة تُعرض فوراً والبيانات تُحمّل في الخلفية، ويُرسل حدث data_loaded عند اكتمالها
+            threading.Thread(target=self.load_data, name="data-loader", daemon=True).start()
+        else:
+            self.load_data()
+
+    @classmethod
+    def shared(cls, background=False):
+        # نواة بيانات واحدة للعملية كلها: كل الجلسات (نوافذ المتصفح) تشترك فيها بدل تحميل قاعدة البيانات لكل جلسة
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(background)
+            return cls._shared
+
+    def subscribe(self, callback):
+        # callback(event, items) حيث event أحد: student_added, student_updated, student_removed,
+        # attendance_recorded, data_loaded (و items قائمة طلاب) أو groups_changed (و items قائمة مجموعات)
+        if callback not in self.listeners:
+            self.listeners = self.listeners + [callback]
+
+    def unsubscribe(self, callback):
+        self.listeners = [c for c in self.listeners if c != callback]
+
+    def _emit(self, event, items):
+        # يُستدعى تحت _write_lock: المستمعون يُلتقطون الآن، ويُستدعون بعد تحرير القفل (راجع synchronized)
+        self._sort_cache = {}
+        self._pending_events = self._pending_events + [(event, items, self.listeners)]
+        if self._lock_depth == 0:
+            events, self._pending_events = self._pending_events, []
+            self._dispatch(events)
+
+    def _dispatch(self, events):
+        for event, items, listeners in events:
+            for callback in listeners:
+                try:
+                    callback(event, items)
+                except Exception as e:
+                    print(f"Error in {event} listener: {str(e)}")
+
+    def _rebuild_indexes(self):
+        members = {g.name: [] for g in self.groups}
+        for student in self.students:
+            if student.group in members:
+                members[student.group].append(student)
+        for group in self.groups:
+            group.students = members[group.name]
+        self.students_by_id = {s.id: s for s in self.students}
+        self.groups_by_name = {g.name: g for g in self.groups}
+        self.search_index.rebuild(self.students)
+        self.group_index.rebuild(self.groups)
+        self._sort_cache = {}
+
+    def _replace_student(self, old, new):
+        # نشر نسخة الطالب الجديدة في القوائم والفهارس؛ استدعاؤها بالعكس يتراجع عن التعديل
+        self.students = [new if s is old else s for s in self.students]
+        self.students_by_id = {**self.students_by_id, new.id: new}
+        old_group = self.find_group(old.group)
+        new_group = self.find_group(new.group)
+        if old_group is new_group:
+            if old_group:
+                old_group.students = [new if s is old else s for s in old_group.students]
+        else:
+            if old_group:
+                old_group.students = [s for s in old_group.students if s is not old]
+            if new_group:
+                new_group.students = new_group.students + [new]
+        self.search_index.update(new)
+        self._sort_cache = {}
+
+    def _replace_students(self, pairs):
+        # مثل _replace_student لعدة طلاب (old, new): المجموعات المتأثرة تُنشر كنسخ جديدة بقوائم أعضاء جديدة
+        swap = {id(old): new for old, new in pairs}
+        students = [swap.get(id(s), s) for s in self.students]
+        members = {name: [] for old, new in pairs for name in (old.group, new.group)}
+        for student in students:
+            if student.group in members:
+                members[student.group].append(student)
+        groups = {}
+        for name, group_students in members.items():
+            group = self.find_group(name)
+            if group:
+                groups[name] = Group(group.name, group.time, group.days)
+                groups[name].students = group_students
+        self.groups = [groups.get(g.name, g) for g in self.groups]
+        self.groups_by_name = {**self.groups_by_name, **groups}
+        self.students = students
+        self.students_by_id = {**self.students_by_id, **{new.id: new for old, new in pairs}}
+        for group in groups.values():
+            self.group_index.update(group)
+        for old, new in pairs:
+            self.search_index.update(new)
+        self._sort_cache = {}
+
+    def _replace_group(self, old, new):
+        # مثل _replace_student: new.students نسخ طلاب old بعد التعديل
+        members = {s.id: s for s in new.students}
+        self.groups = [new if g is old else g for g in self.groups]
+        self.groups_by_name = {**{k: g for k, g in self.groups_by_name.items() if g is not old}, new.name: new}
+        self.students = [members.get(s.id, s) for s in self.students]
+        self.students_by_id = {**self.students_by_id, **members}
+        self.group_index.update(new, old_key=old.name)
+        for student in new.students:
+            self.search_index.update(student)
+        self._sort_cache = {}
+
+    def snapshot(self):
+        with self._write_lock:
+            return self.students, self.groups
 
+    def find_student(self, student_id):
+        return self.students_by_id.get(student_id)
+
+    def find_group(self, group_name):
+        return self.groups_by_name.get(group_name)
+
+    def search_students(self, query):
+        # يُرجع مجموعة IDs المطابقة، أو None إذا كان البحث فارغاً
+        return self.search_index.search(query)
+
+    def search_groups(self, query):
+        # يُرجع مجموعة أسماء المجموعات المطابقة، أو None إذا كان البحث فارغاً
+        return self.group_index.search(query)
+
+    def _ordered(self, kind, items, sort_keys, order):
+        # order قائمة من (العمود، تنازلي؟) بالأولوية؛ يُرتَّب مرة واحدة لكل ترتيب ويُعاد استخدامه
+        # حتى تتغير البيانات (تُستبدل القائمة أو يُمسح الكاش عند أي حدث)
+        if not order:
+            return items
+        cache_key = (kind, tuple(order))
+        cached = self._sort_cache.get(cache_key)
+        if cached is None or cached[0] is not items:
+            ordered = list(items)
+            # الترتيب في Python مستقر، فنرتب بالأعمدة من الأقل أولوية إلى الأعلى
+            for field, descending in reversed(order):
+                ordered.sort(key=sort_keys[field], reverse=descending)
+            cached = (items, ordered)
+            self._sort_cache = {**self._sort_cache, cache_key: cached}
+        return cached[1]
+
+    def get_groups_page(self, offset, limit, group_names=None, order=None):
+        groups = self._ordered("groups", self.groups, GROUP_SORT_KEYS, order)
+        if group_names is not None:
+            groups = [g for g in groups if g.name in group_names]
+        return groups[offset:offset + limit], len(groups)
+
+    def get_today_stats(self):
+        # الحضور = من سُجّل اليوم، الغياب = باقي طلاب المجموعات التي موعدها اليوم
+        today = datetime.now().strftime("%Y-%m-%d")
+        today_name_arabic = DAYS_MAPPING.get(datetime.now().strftime("%A"))
+        present = absent = 0
+        for group in self.groups:
+            for student in group.students:
+                if today in student.attendance:
+                    present += 1
+                elif today_name_arabic in group.days.split(','):
+                    absent += 1
+        return present, absent
+
+    def get_students_page(self, offset, limit, student_ids=None, order=None):
+        students = self._ordered("students", self.students, STUDENT_SORT_KEYS, order)
+        if student_ids is not None:
+            students = [s for s in students if s.id in student_ids]
+        return students[offset:offset + limit], len(students)
+
+    @STARTUP.profiled("load_data")
+    @synchronized
     def load_data(self):
         try:
             conn = sqlite3.connect(DATABASE_FILE)
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM groups")
-            groups = cursor.fetchall()
-            for group in groups:
-                self.groups.append(Group(group[1], group[2], group[3]))
+            groups = [Group(group[1], group[2], group[3]) for group in cursor.fetchall()]
 
             cursor.execute("SELECT * FROM students")
-            students = cursor.fetchall()
-            for student in students:
+            students = []
+            for student in cursor.fetchall():
                 new_student = Student(student[1], student[2], student[3])
                 new_student.id = student[0]
                 new_student.attendance = student[4].split(',') if student[4] else []
                 new_student.evaluation = eval(student[5]) if student[5] else {}
-                self.students.append(new_student)
+                students.append(new_student)
             conn.close()
+            self.groups = groups
+            self.students = students
+            self._rebuild_indexes()
             print("تم تحميل البيانات بنجاح")
         except Exception as e:
             print(f"Error loading data: {str(e)}")
+        finally:
+            with self._pending_lock:
+                self._apply_pending_attendance()
+                self.ready.set()
+        self._emit("data_loaded", self.students)
+
+    def _apply_pending_attendance(self):
+        # حضور سُجّل أثناء التحميل: قد تكون القراءة سبقت الكتابة، فنضيفه للذاكرة إن لم يكن موجوداً
+        for student_id, day in self._pending_attendance:
+            student = self.find_student(student_id)
+            if student and day not in student.attendance:
+                student.attendance = student.attendance + [day]
+        self._pending_attendance = []
 
     def save_data(self):
+        students, groups = self.snapshot()
         try:
-            conn = sqlite3.connect(DATABASE_FILE)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM groups")
-            cursor.execute("DELETE FROM students")
-            for group in self.groups:
-                cursor.execute("INSERT INTO groups (name, time, days) VALUES (?, ?, ?)", 
-                             (group.name, group.time, group.days))
-            for student in self.students:
-                cursor.execute("""INSERT INTO students (id, name, phone, group_name, attendance, evaluation) 
-                               VALUES (?, ?, ?, ?, ?, ?)""",
-                             (student.id, student.name, student.phone, student.group, 
-                              ','.join(student.attendance), str(student.evaluation)))
-            conn.commit()
-            conn.close()
+            # الحذف وإعادة الإدراج في معاملة واحدة حتى لا يرى أي اتصال آخر جداول فارغة
+            with self._db_lock:
+                conn = sqlite3.connect(DATABASE_FILE)
+                with conn:
+                    conn.execute("DELETE FROM groups")
+                    conn.execute("DELETE FROM students")
+                    conn.executemany("INSERT INTO groups (name, time, days) VALUES (?, ?, ?)",
+                                     [(group.name, group.time, group.days) for group in groups])
+                    conn.executemany("""INSERT INTO students (id, name, phone, group_name, attendance, evaluation) 
+                                   VALUES (?, ?, ?, ?, ?, ?)""",
+                                     [(student.id, student.name, student.phone, student.group,
+                                       ','.join(student.attendance), str(student.evaluation))
+                                      for student in students])
+                conn.close()
             print("تم حفظ البيانات بنجاح")
             return True
         except Exception as e:
             print(f"Error saving data: {str(e)}")
             return False
 
+    @synchronized
     def add_group(self, name, time, days, page):
-        if any(group.name == name for group in self.groups):
-            NotificationSystem(page).show_toast("هذه المجموعة موجودة بالفعل!", "error")
+        if name in self.groups_by_name:
+            NotificationSystem.for_page(page).show_toast("هذه المجموعة موجودة بالفعل!", "error")
             return False
 
         new_group = Group(name, time, days)
-        self.groups.append(new_group)
+        self.groups = self.groups + [new_group]
+        self.groups_by_name = {**self.groups_by_name, name: new_group}
+        self.group_index.add(new_group)
+        self._sort_cache = {}
         if self.save_data():
-            NotificationSystem(page).show_toast(f"تمت إضافة المجموعة: {name}", "success")
+            NotificationSystem.for_page(page).show_toast(f"تمت إضافة المجموعة: {name}", "success")
+            self._emit("groups_changed", [new_group])
             return True
         else:
-            NotificationSystem(page).show_toast("حدث خطأ أثناء حفظ المجموعة!", "error")
+            NotificationSystem.for_page(page).show_toast("حدث خطأ أثناء حفظ المجموعة!", "error")
             return False
 
+    @synchronized
     def add_student(self, name, phone, group_name, page):
-        group = next((g for g in self.groups if g.name == group_name), None)
+        group = self.find_group(group_name)
         if not group:
-            NotificationSystem(page).show_toast("المجموعة غير موجودة!", "error")
+            NotificationSystem.for_page(page).show_toast("المجموعة غير موجودة!", "error")
             return False
 
         # توليد ID مكون من 5 أرقام بشكل فريد
         while True:
             student_id = random.randint(10000, 99999)
-            if not any(s.id == student_id for s in self.students):
+            if student_id not in self.students_by_id:
                 break
 
         try:
-            conn = sqlite3.connect(DATABASE_FILE)
-            cursor = conn.cursor()
-            cursor.execute("""INSERT INTO students (id, name, phone, group_name, attendance, evaluation) 
-                           VALUES (?, ?, ?, ?, ?, ?)""",
-                         (student_id, name, phone, group_name, '', '{}'))
-            conn.commit()
-            conn.close()
+            with self._db_lock:
+                conn = sqlite3.connect(DATABASE_FILE)
+                cursor = conn.cursor()
+                cursor.execute("""INSERT INTO students (id, name, phone, group_name, attendance, evaluation) 
+                               VALUES (?, ?, ?, ?, ?, ?)""",
+                             (student_id, name, phone, group_name, '', '{}'))
+                conn.commit()
+                conn.close()
 
             new_student = Student(name, phone, group_name)
             new_student.id = student_id
-            self.students.append(new_student)
+            self.students = self.students + [new_student]
+            self.students_by_id = {**self.students_by_id, student_id: new_student}
+            self.search_index.add(new_student)
             group.add_student(new_student, page)
-            new_student.generate_qr_code(page)
             
             if self.save_data():
-                NotificationSystem(page).show_toast(f"تمت إضافة الطالب: {name} (ID: {new_student.id})", "success")
+                NotificationSystem.for_page(page).show_toast(f"تمت إضافة الطالب: {name} (ID: {new_student.id})", "success")
+                self._emit("student_added", [new_student])
                 return True
             else:
-                NotificationSystem(page).show_toast("حدث خطأ أثناء حفظ الطالب!", "error")
+                NotificationSystem.for_page(page).show_toast("حدث خطأ أثناء حفظ الطالب!", "error")
                 return False
         except Exception as e:
-            NotificationSystem(page).show_toast(f"خطأ في إضافة الطالب: {str(e)}", "error")
+            NotificationSystem.for_page(page).show_toast(f"خطأ في إضافة الطالب: {str(e)}", "error")
             return False
 
+    @synchronized
     def delete_student(self, student_id, page):
-        student = next((s for s in self.students if s.id == student_id), None)
+        student = self.find_student(student_id)
         if not student:
-            NotificationSystem(page).show_toast("الطالب غير موجود!", "error")
+            NotificationSystem.for_page(page).show_toast("الطالب غير موجود!", "error")
             return False
 
-        self.students.remove(student)
+        self.students = [s for s in self.students if s is not student]
+        self.students_by_id = {k: s for k, s in self.students_by_id.items() if k != student_id}
+        self.search_index.remove(student_id)
+        group = self.find_group(student.group)
+        if group:
+            group.students = [s for s in group.students if s is not student]
         if self.save_data():
-            NotificationSystem(page).show_toast(f"تم حذف الطالب: {student.name}", "success")
+            NotificationSystem.for_page(page).show_toast(f"تم حذف الطالب: {student.name}", "success")
+            self._emit("student_removed", [student])
             return True
         else:
-            NotificationSystem(page).show_toast("حدث خطأ أثناء حذف الطالب!", "error")
+            NotificationSystem.for_page(page).show_toast("حدث خطأ أثناء حذف الطالب!", "error")
             return False
 
+    @synchronized
     def delete_group(self, group_name, page):
-        group = next((g for g in self.groups if g.name == group_name), None)
+        group = self.find_group(group_name)
         if not group:
-            NotificationSystem(page).show_toast("المجموعة غير موجودة!", "error")
+            NotificationSystem.for_page(page).show_toast("المجموعة غير موجودة!", "error")
             return False
 
         # حذف جميع الطلاب في هذه المجموعة أولاً
-        students_to_remove = [s for s in self.students if s.group == group_name]
-        for student in students_to_remove:
-            self.students.remove(student)
-
-        self.groups.remove(group)
+        removed = group.students
+        self.students = [s for s in self.students if s.group != group_name]
+        self.groups = [g for g in self.groups if g is not group]
+        self._rebuild_indexes()
         if self.save_data():
-            NotificationSystem(page).show_toast(f"تم حذف المجموعة: {group_name}", "success")
+            NotificationSystem.for_page(page).show_toast(f"تم حذف المجموعة: {group_name}", "success")
+            self._emit("groups_changed", [group])
+            if removed:
+                self._emit("student_removed", removed)
             return True
         else:
-            NotificationSystem(page).show_toast("حدث خطأ أثناء حذف المجموعة!", "error")
+            NotificationSystem.for_page(page).show_toast("حدث خطأ أثناء حذف المجموعة!", "error")
             return False
 
+    @synchronized
     def edit_student(self, student_id, new_name, new_phone, new_group, page):
-        student = next((s for s in self.students if s.id == student_id), None)
+        student = self.find_student(student_id)
         if not student:
-            NotificationSystem(page).show_toast("الطالب غير موجود!", "error")
+            NotificationSystem.for_page(page).show_toast("الطالب غير موجود!", "error")
             return False
 
-        old_group = next((g for g in self.groups if g.name == student.group), None)
-        new_group_obj = next((g for g in self.groups if g.name == new_group), None)
-        
-        if not new_group_obj:
-            NotificationSystem(page).show_toast("المجموعة الجديدة غير موجودة!", "error")
+        if not self.find_group(new_group):
+            NotificationSystem.for_page(page).show_toast("المجموعة الجديدة غير موجودة!", "error")
             return False
 
-        # تحديث بيانات الطالب
-        student.name = new_name
-        student.phone = new_phone
-        
-        # إذا تغيرت المجموعة، نقوم بنقل الطالب
-        if student.group != new_group:
-            if old_group:
-                old_group.students.remove(student)
-            student.group = new_group
-            new_group_obj.students.append(student)
+        # تحديث بيانات الطالب (ونقله إن تغيرت المجموعة) بنشر نسخة جديدة منه
+        updated = student.replace(name=new_name, phone=new_phone, group=new_group)
+        self._replace_student(student, updated)
 
         if self.save_data():
-            NotificationSystem(page).show_toast(f"تم تعديل بيانات الطالب: {student.name}", "success")
+            NotificationSystem.for_page(page).show_toast(f"تم تعديل بيانات الطالب: {updated.name}", "success")
+            self._emit("student_updated", [updated])
             return True
         else:
-            NotificationSystem(page).show_toast("حدث خطأ أثناء تعديل بيانات الطالب!", "error")
+            self._replace_student(updated, student)
+            NotificationSystem.for_page(page).show_toast("حدث خطأ أثناء تعديل بيانات الطالب!", "error")
             return False
 
+    @synchronized
     def edit_group(self, old_name, new_name, new_time, new_days, page):
-        group = next((g for g in self.groups if g.name == old_name), None)
+        group = self.find_group(old_name)
         if not group:
-            NotificationSystem(page).show_toast("المجموعة غير موجودة!", "error")
+            NotificationSystem.for_page(page).show_toast("المجموعة غير موجودة!", "error")
             return False
 
         # التحقق من أن الاسم الجديد غير مستخدم (إذا تغير)
-        if old_name != new_name and any(g.name == new_name for g in self.groups):
-            NotificationSystem(page).show_toast("اسم المجموعة الجديد مستخدم بالفعل!", "error")
+        if old_name != new_name and new_name in self.groups_by_name:
+            NotificationSystem.for_page(page).show_toast("اسم المجموعة الجديد مستخدم بالفعل!", "error")
             return False
 
-        # تحديث بيانات المجموعة
-        group.name = new_name
-        group.time = new_time
-        group.days = new_days
-
-        # تحديث مجموعة الطلاب المرتبطين
-        for student in self.students:
-            if student.group == old_name:
-                student.group = new_name
+        # تحديث بيانات المجموعة وطلابها المرتبطين بنشر نسخ جديدة منها
+        updated = Group(new_name, new_time, new_days)
+        updated.students = [s.replace(group=new_name) for s in group.students]
+        self._replace_group(group, updated)
 
         if self.save_data():
-            NotificationSystem(page).show_toast(f"تم تعديل بيانات المجموعة: {group.name}", "success")
+            NotificationSystem.for_page(page).show_toast(f"تم تعديل بيانات المجموعة: {updated.name}", "success")
+            self._emit("groups_changed", [updated])
+            if updated.students:
+                self._emit("student_updated", updated.students)
             return True
         else:
-            NotificationSystem(page).show_toast("حدث خطأ أثناء تعديل بيانات المجموعة!", "error")
+            self._replace_group(updated, group)
+            NotificationSystem.for_page(page).show_toast("حدث خطأ أثناء تعديل بيانات المجموعة!", "error")
             return False
 
     def record_attendance(self, student_id, page):
-        student = next((s for s in self.students if s.id == student_id), None)
+        if not self.ready.is_set():
+            result = self._record_attendance_early(student_id, page)
+            if result is not None:
+                return result
+        return self._record_attendance(student_id, page)
+
+    def _record_attendance_early(self, student_id, page):
+        # تسجيل يدوي بالـ ID قبل اكتمال التحميل: طالب واحد ومجموعته من القاعدة مباشرة بدلاً من انتظار الكل
+        # يُرجع None إذا اكتمل التحميل في هذه الأثناء، فيُكمل المسار العادي من الذاكرة
+        with self._pending_lock:
+            if self.ready.is_set():
+                return None
+
+            today = datetime.now().strftime("%Y-%m-%d")
+            today_name = datetime.now().strftime("%A")
+            today_name_arabic = DAYS_MAPPING.get(today_name, today_name)
+            try:
+                with self._db_lock:
+                    conn = sqlite3.connect(DATABASE_FILE)
+                    student = conn.execute("SELECT name, group_name, attendance FROM students WHERE id=?",
+                                           (student_id,)).fetchone()
+                    group = conn.execute("SELECT days FROM groups WHERE name=?",
+                                         (student[1],)).fetchone() if student else None
+                    conn.close()
+            except Exception as e:
+                print(f"Error reading student: {str(e)}")
+                NotificationSystem.for_page(page).show_toast("حدث خطأ أثناء تسجيل الحضور!", "error")
+                return False
+
+            if not student:
+                NotificationSystem.for_page(page).show_toast("الطالب غير موجود!", "error")
+                return False
+            if not group:
+                NotificationSystem.for_page(page).show_toast("المجموعة غير موجودة!", "error")
+                return False
+
+            name, _, attendance = student
+            attendance = attendance.split(',') if attendance else []
+            if today_name_arabic not in group[0].split(','):
+                NotificationSystem.for_page(page).show_toast(f"اليوم ({today_name_arabic}) ليس من أيام المجموعة!", "error")
+                return False
+            if today in attendance:
+                NotificationSystem.for_page(page).show_toast("تم تسجيل حضور هذا الطالب مسبقًا اليوم!", "error")
+                return False
+
+            try:
+                with self._db_lock:
+                    conn = sqlite3.connect(DATABASE_FILE)
+                    with conn:
+                        conn.execute("UPDATE students SET attendance=? WHERE id=?",
+                                     (','.join(attendance + [today]), student_id))
+                    conn.close()
+            except Exception as e:
+                print(f"Error saving attendance: {str(e)}")
+                NotificationSystem.for_page(page).show_toast("حدث خطأ أثناء تسجيل الحضور!", "error")
+                return False
+
+            self._pending_attendance.append((student_id, today))
+            NotificationSystem.for_page(page).show_toast(f"تم تسجيل حضور الطالب {name} بتاريخ {today}", "success")
+            return True
+
+    @synchronized
+    def _record_attendance(self, student_id, page):
+        student = self.find_student(student_id)
         if not student:
-            NotificationSystem(page).show_toast("الطالب غير موجود!", "error")
+            NotificationSystem.for_page(page).show_toast("الطالب غير موجود!", "error")
             return False
         
         today = datetime.now().strftime("%Y-%m-%d")
-        group = next((g for g in self.groups if g.name == student.group), None)
+        group = self.find_group(student.group)
         if not group:
-            NotificationSystem(page).show_toast("المجموعة غير موجودة!", "error")
+            NotificationSystem.for_page(page).show_toast("المجموعة غير موجودة!", "error")
+            return False
+        
+        group_days = group.days.split(',')
+        today_name = datetime.now().strftime("%A")
+        
+        today_name_arabic = DAYS_MAPPING.get(today_name, today_name)
+        
+        if today_name_arabic not in group_days:
+            NotificationSystem.for_page(page).show_toast(f"اليوم ({today_name_arabic}) ليس من أيام المجموعة!", "error")
+            return False
+        
+        if today in student.attendance:
+            NotificationSystem.for_page(page).show_toast("تم تسجيل حضور هذا الطالب مسبقًا اليوم!", "error")
+            return False
+        
+        previous = student.attendance
+        student.attendance = previous + [today]
+        if self._save_attendance([student]):
+            NotificationSystem.for_page(page).show_toast(f"تم تسجيل حضور الطالب {student.name} بتاريخ {today}", "success")
+            self._emit("attendance_recorded", [student])
+            return True
+        else:
+            student.attendance = previous
+            NotificationSystem.for_page(page).show_toast("حدث خطأ أثناء تسجيل الحضور!", "error")
+            return False
+
+    def _save_attendance(self, students):
+        try:
+            with self._db_lock:
+                conn = sqlite3.connect(DATABASE_FILE)
+                with conn:
+                    conn.executemany("UPDATE students SET attendance=? WHERE id=?",
+                                     [(','.join(s.attendance), s.id) for s in students])
+                conn.close()
+            return True
+        except Exception as e:
+            print(f"Error saving attendance: {str(e)}")
+            return False
+
+    @synchronized
+    def record_attendance_many(self, student_ids, page):
+        today = datetime.now().strftime("%Y-%m-%d")
+        today_name_arabic = DAYS_MAPPING.get(datetime.now().strftime("%A"))
+        results = {}
+        accepted = []
+
+        for student_id in dict.fromkeys(student_ids):
+            student = self.find_student(student_id)
+            if not student:
+                results[student_id] = (False, "الطالب غير موجود!")
+                continue
+            group = self.find_group(student.group)
+            if not group:
+                results[student_id] = (False, "المجموعة غير موجودة!")
+            elif today_name_arabic not in group.days.split(','):
+                results[student_id] = (False, f"اليوم ({today_name_arabic}) ليس من أيام المجموعة!")
+            elif today in student.attendance:
+                results[student_id] = (False, "تم تسجيل حضور هذا الطالب مسبقًا اليوم!")
+            else:
+                accepted.append(student)
+
+        previous = {student.id: student.attendance for student in accepted}
+        for student in accepted:
+            student.attendance = student.attendance + [today]
+        if accepted and not self._save_attendance(accepted):
+            for student in accepted:
+                student.attendance = previous[student.id]
+                results[student.id] = (False, "حدث خطأ أثناء تسجيل الحضور!")
+            accepted = []
+        for student in accepted:
+            results[student.id] = (True, student.name)
+        if accepted:
+            self._emit("attendance_recorded", accepted)
+
+        failed = len(results) - len(accepted)
+        if failed:
+            NotificationSystem.for_page(page).show_toast(f"تم تسجيل حضور {len(accepted)} طالب، وتعذر تسجيل {failed}", "warning")
+        else:
+            NotificationSystem.for_page(page).show_toast(f"تم تسجيل حضور {len(accepted)} طالب بتاريخ {today}", "success")
+        return results
+
+    def import_attendance_from_media(self, paths, page):
+        try:
+            codes = collect_codes_from_media(paths)
+        except Exception as e:
+            NotificationSystem.for_page(page).show_toast(f"خطأ في قراءة الملفات: {str(e)}", "error")
+            return None
+
+        student_ids = []
+        for code in codes:
+            try:
+                student_ids.append(int(code))
+            except ValueError:
+                print(f"Ignoring invalid QR payload: {code}")
+
+        if not student_ids:
+            NotificationSystem.for_page(page).show_toast("لم يتم العثور على أي QR Code في الملفات!", "error")
+            return None
+        return self.record_attendance_many(sorted(student_ids), page)
+
+    @synchronized
+    def evaluate_student(self, student_id, stars, notes, page):
+        student = self.find_student(student_id)
+        if not student:
+            NotificationSystem.for_page(page).show_toast("الطالب غير موجود!", "error")
+            return False
+        
+        today = datetime.now().strftime("%Y-%m-%d")
+        student.evaluation = {**student.evaluation, today: {"stars": stars, "notes": notes}}
+        
+        if self.save_data():
+            NotificationSystem.for_page(page).show_toast(f"تم تقييم الطالب {student.name} بنجاح!", "success")
+            self._emit("student_updated", [student])
+            return True
+        else:
+            NotificationSystem.for_page(page).show_toast("حدث خطأ أثناء حفظ التقييم!", "error")
+            return False
+
+    def _save_students(self, updated=(), deleted=()):
+        # تعديل/حذف عدة طلاب في معاملة واحدة بدلاً من إعادة كتابة الجداول كلها لكل طالب
+        try:
+            with self._db_lock:
+                conn = sqlite3.connect(DATABASE_FILE)
+                with conn:
+                    conn.executemany("DELETE FROM students WHERE id=?", [(s.id,) for s in deleted])
+                    conn.executemany("UPDATE students SET name=?, phone=?, group_name=?, evaluation=? WHERE id=?",
+                                     [(s.name, s.phone, s.group, str(s.evaluation), s.id) for s in updated])
+                conn.close()
+            return True
+        except Exception as e:
+            print(f"Error saving students: {str(e)}")
+            return False
+
+    @synchronized
+    def delete_students(self, student_ids, page):
+        ids = set(student_ids)
+        removed = [s for s in self.students if s.id in ids]
+        if not removed:
+            NotificationSystem.for_page(page).show_toast("لم يتم تحديد أي طالب!", "error")
+            return False
+
+        previous = self.students
+        self.students = [s for s in previous if s.id not in ids]
+        for name in {s.group for s in removed}:
+            group = self.find_group(name)
+            if group:
+                group.students = [s for s in group.students if s.id not in ids]
+        self.students_by_id = {k: s for k, s in self.students_by_id.items() if k not in ids}
+        for student in removed:
+            self.search_index.remove(student.id)
+        if self._save_students(deleted=removed):
+            NotificationSystem.for_page(page).show_toast(f"تم حذف {len(removed)} طالب", "success")
+            self._emit("student_removed", removed)
+            return True
+        else:
+            self.students = previous
+            self._rebuild_indexes()
+            NotificationSystem.for_page(page).show_toast("حدث خطأ أثناء حذف الطلاب!", "error")
             return False
-        
-        group_days = group.days.split(',')
-        today_name = datetime.now().strftime("%A")
-        
-        days_mapping = {
-            "Saturday": "السبت",
-            "Sunday": "الأحد",
-            "Monday": "الاثنين",
-            "Tuesday": "الثلاثاء",
-            "Wednesday": "الأربعاء",
-            "Thursday": "الخميس",
-            "Friday": "الجمعة"
-        }
-        today_name_arabic = days_mapping.get(today_name, today_name)
-        
-        if today_name_arabic not in group_days:
-            NotificationSystem(page).show_toast(f"اليوم ({today_name_arabic}) ليس من أيام المجموعة!", "error")
+
+    @synchronized
+    def move_students(self, student_ids, group_name, page):
+        target = self.find_group(group_name)
+        if not target:
+            NotificationSystem.for_page(page).show_toast("المجموعة الجديدة غير موجودة!", "error")
             return False
-        
-        if today in student.attendance:
-            NotificationSystem(page).show_toast("تم تسجيل حضور هذا الطالب مسبقًا اليوم!", "error")
+
+        ids = set(student_ids)
+        moving = [s for s in self.students if s.id in ids and s.group != group_name]
+        if not moving:
+            NotificationSystem.for_page(page).show_toast("الطلاب المحددون في هذه المجموعة بالفعل!", "warning")
             return False
-        
-        student.attendance.append(today)
-        if self.save_data():
-            NotificationSystem(page).show_toast(f"تم تسجيل حضور الطالب {student.name} بتاريخ {today}", "success")
+
+        pairs = [(s, s.replace(group=group_name)) for s in moving]
+        moved = [new for old, new in pairs]
+        self._replace_students(pairs)
+        if self._save_students(updated=moved):
+            NotificationSystem.for_page(page).show_toast(f"تم نقل {len(moved)} طالب إلى {group_name}", "success")
+            self._emit("student_updated", moved)
             return True
         else:
-            NotificationSystem(page).show_toast("حدث خطأ أثناء تسجيل الحضور!", "error")
+            self._replace_students([(new, old) for old, new in pairs])
+            NotificationSystem.for_page(page).show_toast("حدث خطأ أثناء نقل الطلاب!", "error")
             return False
 
-    def evaluate_student(self, student_id, stars, notes, page):
-        student = next((s for s in self.students if s.id == student_id), None)
-        if not student:
-            NotificationSystem(page).show_toast("الطالب غير موجود!", "error")
+    @synchronized
+    def evaluate_students(self, student_ids, stars, notes, page):
+        ids = set(student_ids)
+        students = [s for s in self.students if s.id in ids]
+        if not students:
+            NotificationSystem.for_page(page).show_toast("لم يتم تحديد أي طالب!", "error")
             return False
-        
+
         today = datetime.now().strftime("%Y-%m-%d")
-        student.evaluation[today] = {"stars": stars, "notes": notes}
-        
-        if self.save_data():
-            NotificationSystem(page).show_toast(f"تم تقييم الطالب {student.name} بنجاح!", "success")
+        pairs = [(s, s.replace(evaluation={**s.evaluation, today: {"stars": stars, "notes": notes}})) for s in students]
+        evaluated = [new for old, new in pairs]
+        self._replace_students(pairs)
+        if self._save_students(updated=evaluated):
+            NotificationSystem.for_page(page).show_toast(f"تم تقييم {len(evaluated)} طالب بنجاح!", "success")
+            self._emit("student_updated", evaluated)
             return True
         else:
-            NotificationSystem(page).show_toast("حدث خطأ أثناء حفظ التقييم!", "error")
+            self._replace_students([(new, old) for old, new in pairs])
+            NotificationSystem.for_page(page).show_toast("حدث خطأ أثناء حفظ التقييم!", "error")
             return False
 
+    def print_qr_cards(self, page, group_name=None):
+        if group_name:
+            group = self.find_group(group_name)
+            if not group:
+                NotificationSystem.for_page(page).show_toast("المجموعة غير موجودة!", "error")
+                return None
+            students = group.students
+        else:
+            students = self.students
+
+        if not students:
+            NotificationSystem.for_page(page).show_toast("لا يوجد طلاب لإنشاء بطاقات لهم!", "error")
+            return None
+
+        try:
+            qr_paths, rendered = generate_qr_batch(students)
+            paths = compose_card_sheets(
+                sorted(students, key=lambda s: (s.group, s.name)),
+                qr_paths,
+                f"reports/qr_cards_{group_name or 'all'}"
+            )
+            NotificationSystem.for_page(page).show_toast(
+                f"تم إنشاء {len(students)} بطاقة ({rendered} QR جديد) في: {os.path.abspath(paths[0])}", "success")
+            if not arabic_shaping_available():
+                NotificationSystem.for_page(page).show_toast(
+                    "الأسماء العربية في البطاقات قد تظهر بحروف منفصلة: ثبّت arabic-reshaper و python-bidi", "warning")
+            return paths
+        except Exception as e:
+            NotificationSystem.for_page(page).show_toast(f"خطأ في إنشاء بطاقات QR: {str(e)}", "error")
+            return None
+
     def generate_monthly_report(self, student_id, start_date, end_date, page):
-        student = next((s for s in self.students if s.id == student_id), None)
+        student = self.find_student(student_id)
         if not student:
-            NotificationSystem(page).show_toast("الطالب غير موجود!", "error")
+            NotificationSystem.for_page(page).show_toast("الطالب غير موجود!", "error")
             return None
 
-        group = next((g for g in self.groups if g.name == student.group), None)
+        group = self.find_group(student.group)
         if not group:
-            NotificationSystem(page).show_toast("المجموعة غير موجودة!", "error")
+            NotificationSystem.for_page(page).show_toast("المجموعة غير موجودة!", "error")
             return None
 
         group_days = group.days.split(',')
@@ -422,24 +2147,14 @@ class AttendanceSystem:
             start = datetime.strptime(start_date, "%Y-%m-%d")
             end = datetime.strptime(end_date, "%Y-%m-%d")
         except ValueError:
-            NotificationSystem(page).show_toast("صيغة التاريخ غير صحيحة! استخدم YYYY-MM-DD", "error")
+            NotificationSystem.for_page(page).show_toast("صيغة التاريخ غير صحيحة! استخدم YYYY-MM-DD", "error")
             return None
 
-        days_mapping = {
-            "Saturday": "السبت",
-            "Sunday": "الأحد",
-            "Monday": "الاثنين",
-            "Tuesday": "الثلاثاء",
-            "Wednesday": "الأربعاء",
-            "Thursday": "الخميس",
-            "Friday": "الجمعة"
-        }
-
         current_date = start
         while current_date <= end:
             date_str = current_date.strftime("%Y-%m-%d")
             day_name = current_date.strftime("%A")
-            day_name_arabic = days_mapping.get(day_name, day_name)
+            day_name_arabic = DAYS_MAPPING.get(day_name, day_name)
 
             if day_name_arabic in group_days:
                 data["التاريخ"].append(date_str)
@@ -467,121 +2182,201 @@ class AttendanceSystem:
         absence_percentage = 100 - attendance_percentage if total_days > 0 else 0
 
         try:
-            df = pd.DataFrame(data)
-            file_path = f"reports/{student.name}_report.xlsx"
-            
-            with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
-                df.to_excel(writer, index=False, sheet_name='تقرير الحضور')
-                workbook = writer.book
-                worksheet = writer.sheets['تقرير الحضور']
-
-                header_format = workbook.add_format({
-                    'bold': True,
-                    'text_wrap': True,
-                    'align': 'center',
-                    'valign': 'vcenter',
-                    'fg_color': '#4CAF50',
-                    'border': 1,
-                    'font_color': 'white'
-                })
-
-                for col_num, value in enumerate(df.columns.values):
-                    worksheet.write(0, col_num, value, header_format)
-
-                cell_format_green = workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'})
-                cell_format_red = workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'})
-
-                for row_num in range(1, len(df) + 1):
-                    if df.iloc[row_num - 1]['الحضور'] == 'حاضر':
-                        worksheet.set_row(row_num, None, cell_format_green)
-                    else:
-                        worksheet.set_row(row_num, None, cell_format_red)
-
-                worksheet.write(len(df) + 2, 0, f"تقرير الحضور للطالب {student.name} (ID: {student.id})")
-                worksheet.write(len(df) + 3, 0, f"نسبة الحضور: {attendance_percentage:.2f}%")
-                worksheet.write(len(df) + 4, 0, f"نسبة الغياب: {absence_percentage:.2f}%")
-                worksheet.write(len(df) + 5, 0, f"حضر: {present_days} مرة")
-                worksheet.write(len(df) + 6, 0, f"غاب: {absent_days} مرة")
+            file_path = MONTHLY_REPORT_TEMPLATE.write(
+                f"reports/{student.name}_report.xlsx",
+                data,
+                summary_lines=[
+                    f"تقرير الحضور للطالب {student.name} (ID: {student.id})",
+                    f"نسبة الحضور: {attendance_percentage:.2f}%",
+                    f"نسبة الغياب: {absence_percentage:.2f}%",
+                    f"حضر: {present_days} مرة",
+                    f"غاب: {absent_days} مرة"
+                ]
+            )
 
-            NotificationSystem(page).show_toast(f"تم إنشاء التقرير بنجاح: {file_path}", "success")
+            NotificationSystem.for_page(page).show_toast(f"تم إنشاء التقرير بنجاح: {file_path}", "success")
             return file_path
         except Exception as e:
-            NotificationSystem(page).show_toast(f"خطأ في إنشاء التقرير: {str(e)}", "error")
+            NotificationSystem.for_page(page).show_toast(f"خطأ في إنشاء التقرير: {str(e)}", "error")
             return None
 
-    def scan_qr_code(self, page):
+    def scan_qr_code(self, page, source=None):
+        cap = source or CameraSession.shared()
+        try:
+            opened = cap.open()
+        except CameraBusyError:
+            NotificationSystem.for_page(page).show_toast("الكاميرا مستخدمة في مسح آخر حالياً!", "error")
+            return
+        if not opened:
+            cap.release()
+            NotificationSystem.for_page(page).show_toast("تعذر الوصول إلى الكاميرا!", "error")
+            return
+
+        ui = UpdateScheduler.for_page(page)
+
         def close_camera(e=None):
-            nonlocal cap
-            if cap:
-                cap.release()
-            cv2.destroyAllWindows()
-            if hasattr(page, 'dialog') and page.dialog.open:
-                page.dialog.open = False
-                page.update()
-
-        cap = None
+            pipeline.stop()
+            if dlg.open:
+                dlg.open = False
+                ui.flush_now()
+
+        def on_barcodes(barcodes):
+            # مسح لمرة واحدة: نوقف الخط عند أول كود مقروء
+            pipeline.stop()
+            try:
+                student_id = int(barcodes[0].data.decode("utf-8"))
+                self.record_attendance(student_id, page)
+            except Exception as e:
+                NotificationSystem.for_page(page).show_toast(f"خطأ في قراءة QR Code: {str(e)}", "error")
+            close_camera()
+
+        def on_error(message):
+            NotificationSystem.for_page(page).show_toast(message, "error")
+            close_camera()
+
+        preview_encoder = PreviewEncoder()
+        preview_image = ft.Image(
+            src_base64=preview_encoder.placeholder(),
+            width=preview_encoder.width,
+            fit=ft.ImageFit.CONTAIN,
+            gapless_playback=True,
+            border_radius=10
+        )
+
+        def on_preview(image):
+            if dlg.open:
+                preview_image.src_base64 = image
+                ui.mark_dirty(preview_image)
+
+        dlg = ft.AlertDialog(
+            title=ft.Text("مسح QR Code"),
+            content=ft.Column([
+                ft.Text("جارٍ مسح QR Code...", size=16),
+                preview_image,
+                ft.ElevatedButton(
+                    "إلغاء",
+                    on_click=close_camera,
+                    color=ft.colors.WHITE,
+                    bgcolor=ft.colors.RED
+                )
+            ], tight=True),
+            on_dismiss=close_camera
+        )
+
+        pipeline = ScannerPipeline(cap, on_barcodes, on_error, on_preview, preview=preview_encoder)
+        page.dialog = dlg
+        dlg.open = True
+        ui.flush_now()
+        pipeline.start()
+
+    def kiosk_scan(self, page, ttl=30, source=None):
+        cap = source or CameraSession.shared()
         try:
-            cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-            if not cap.isOpened():
-                NotificationSystem(page).show_toast("تعذر الوصول إلى الكاميرا!", "error")
-                return
+            opened = cap.open()
+        except CameraBusyError:
+            NotificationSystem.for_page(page).show_toast("الكاميرا مستخدمة في مسح آخر حالياً!", "error")
+            return
+        if not opened:
+            cap.release()
+            NotificationSystem.for_page(page).show_toast("تعذر الوصول إلى الكاميرا!", "error")
+            return
 
-            dlg = ft.AlertDialog(
-                title=ft.Text("مسح QR Code"),
-                content=ft.Column([
-                    ft.Text("جارٍ مسح QR Code...", size=16),
-                    ft.ElevatedButton(
-                        "إلغاء",
-                        on_click=close_camera,
-                        color=ft.colors.WHITE,
-                        bgcolor=ft.colors.RED
-                    )
-                ], tight=True),
-                on_dismiss=lambda e: print("Dialog dismissed!")
-            )
-            
-            page.dialog = dlg
-            dlg.open = True
-            page.update()
+        ui = UpdateScheduler.for_page(page)
+        deduplicator = ScanDeduplicator(ttl)
+        checked_in_count = ft.Text("تم تسجيل: 0", size=16, weight=ft.FontWeight.BOLD)
+        checked_in_list = ft.ListView(height=200, spacing=5)
+        preview_encoder = PreviewEncoder()
+        preview_image = ft.Image(
+            src_base64=preview_encoder.placeholder(),
+            width=preview_encoder.width,
+            fit=ft.ImageFit.CONTAIN,
+            gapless_playback=True,
+            border_radius=10
+        )
+        decode_stats = ft.Text("", size=12, color=ft.colors.GREY)
+        lock = threading.Lock()
 
-            while dlg.open:
-                ret, frame = cap.read()
-                if not ret:
-                    NotificationSystem(page).show_toast("تعذر قراءة الصورة من الكاميرا!", "error")
-                    break
+        def close_camera(e=None):
+            pipeline.stop()
+            if dlg.open:
+                dlg.open = False
+                ui.flush_now()
 
-                barcodes = pyzbar.decode(frame)
+        def on_barcodes(barcodes):
+            with lock:
+                student_ids = []
                 for barcode in barcodes:
+                    code = barcode.data.decode("utf-8", errors="replace")
+                    if not deduplicator.accept(code):
+                        continue
                     try:
-                        student_id = int(barcode.data.decode("utf-8"))
-                        self.record_attendance(student_id, page)
-                        close_camera()
-                        return
-                    except Exception as e:
-                        NotificationSystem(page).show_toast(f"خطأ في قراءة QR Code: {str(e)}", "error")
-                        close_camera()
-                        return
-
-                cv2.imshow("QR Code Scanner", frame)
-                if cv2.waitKey(1) & 0xFF == ord('q'):
-                    break
+                        student_ids.append(int(code))
+                    except ValueError:
+                        NotificationSystem.for_page(page).show_toast(f"QR Code غير صالح: {code}", "error")
+                if not student_ids:
+                    return
 
-        except Exception as e:
-            NotificationSystem(page).show_toast(f"خطأ في مسح QR Code: {str(e)}", "error")
-        finally:
+                results = self.record_attendance_many(student_ids, page)
+                recorded = [(student_id, name) for student_id, (ok, name) in results.items() if ok]
+                if recorded:
+                    for student_id, name in recorded:
+                        checked_in_list.controls.insert(0, ft.ListTile(
+                            leading=ft.Icon(ft.icons.CHECK_CIRCLE, color=ft.colors.GREEN),
+                            title=ft.Text(name),
+                            subtitle=ft.Text(f"ID: {student_id} | {datetime.now().strftime('%H:%M:%S')}")
+                        ))
+                    checked_in_count.value = f"تم تسجيل: {len(checked_in_list.controls)}"
+                stats = pipeline.decoder.stats
+                decode_stats.value = f"زمن القراءة: {stats['avg_ms']} ms | إطارات متجاوزة: {stats['skipped']}"
+                ui.mark_dirty(checked_in_count, checked_in_list, decode_stats)
+
+        def on_error(message):
+            NotificationSystem.for_page(page).show_toast(message, "error")
             close_camera()
 
+        def on_preview(image):
+            if dlg.open:
+                preview_image.src_base64 = image
+                ui.mark_dirty(preview_image)
+
+        dlg = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("وضع المسح المستمر"),
+            content=ft.Column([
+                ft.Text("اعرض QR Code أمام الكاميرا، سيتم تسجيل كل طالب تلقائياً", size=14),
+                preview_image,
+                checked_in_count,
+                checked_in_list,
+                decode_stats
+            ], tight=True, width=400),
+            actions=[
+                ft.ElevatedButton(
+                    "إنهاء",
+                    on_click=close_camera,
+                    color=ft.colors.WHITE,
+                    bgcolor=ft.colors.RED
+                )
+            ],
+            actions_alignment=ft.MainAxisAlignment.END
+        )
+
+        pipeline = ScannerPipeline(cap, on_barcodes, on_error, on_preview, preview=preview_encoder)
+        page.dialog = dlg
+        dlg.open = True
+        ui.flush_now()
+        pipeline.start()
+
     def generate_group_report(self, group_name, start_date, end_date, page):
-        group = next((g for g in self.groups if g.name == group_name), None)
+        group = self.find_group(group_name)
         if not group:
-            NotificationSystem(page).show_toast("المجموعة غير موجودة!", "error")
+            NotificationSystem.for_page(page).show_toast("المجموعة غير موجودة!", "error")
             return None
 
         try:
             start = datetime.strptime(start_date, "%Y-%m-%d")
             end = datetime.strptime(end_date, "%Y-%m-%d")
         except ValueError:
-            NotificationSystem(page).show_toast("صيغة التاريخ غير صحيحة! استخدم YYYY-MM-DD", "error")
+            NotificationSystem.for_page(page).show_toast("صيغة التاريخ غير صحيحة! استخدم YYYY-MM-DD", "error")
             return None
 
         data = {
@@ -613,43 +2408,19 @@ class AttendanceSystem:
             data["متوسط التقييم"].append(f"{avg_evaluation:.1f}")
 
         try:
-            df = pd.DataFrame(data)
-            file_path = f"reports/{group.name}_group_report.xlsx"
-            
-            with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
-                df.to_excel(writer, index=False, sheet_name='تقرير المجموعة')
-                workbook = writer.book
-                worksheet = writer.sheets['تقرير المجموعة']
-
-                header_format = workbook.add_format({
-                    'bold': True,
-                    'text_wrap': True,
-                    'align': 'center',
-                    'valign': 'vcenter',
-                    'fg_color': '#4CAF50',
-                    'border': 1,
-                    'font_color': 'white'
-                })
-
-                for col_num, value in enumerate(df.columns.values):
-                    worksheet.write(0, col_num, value, header_format)
-
-                cell_format_green = workbook.add_format({'bg_color': '#C6EFCE', 'font_color': '#006100'})
-                cell_format_red = workbook.add_format({'bg_color': '#FFC7CE', 'font_color': '#9C0006'})
-
-                for row_num in range(1, len(df) + 1):
-                    if float(df.iloc[row_num - 1]['الحضور (%)'].strip('%')) >= 50:
-                        worksheet.set_row(row_num, None, cell_format_green)
-                    else:
-                        worksheet.set_row(row_num, None, cell_format_red)
-
-                worksheet.write(len(df) + 2, 0, f"تقرير المجموعة {group.name}")
-                worksheet.write(len(df) + 3, 0, f"من {start_date} إلى {end_date}")
+            file_path = GROUP_REPORT_TEMPLATE.write(
+                f"reports/{group.name}_group_report.xlsx",
+                data,
+                summary_lines=[
+                    f"تقرير المجموعة {group.name}",
+                    f"من {start_date} إلى {end_date}"
+                ]
+            )
 
-            NotificationSystem(page).show_toast(f"تم إنشاء تقرير المجموعة بنجاح: {file_path}", "success")
+            NotificationSystem.for_page(page).show_toast(f"تم إنشاء تقرير المجموعة بنجاح: {file_path}", "success")
             return file_path
         except Exception as e:
-            NotificationSystem(page).show_toast(f"خطأ في إنشاء تقرير المجموعة: {str(e)}", "error")
+            NotificationSystem.for_page(page).show_toast(f"خطأ في إنشاء تقرير المجموعة: {str(e)}", "error")
             return None
 
     def export_students_list(self, page):
@@ -676,48 +2447,149 @@ class AttendanceSystem:
                 else:
                     data["آخر تقييم"].append("بدون تقييم")
 
-            df = pd.DataFrame(data)
-            file_path = os.path.abspath("reports/students_list.xlsx")
-            
-            with pd.ExcelWriter(file_path, engine='xlsxwriter') as writer:
-                df.to_excel(writer, index=False, sheet_name='قائمة الطلاب')
-                workbook = writer.book
-                worksheet = writer.sheets['قائمة الطلاب']
-
-                header_format = workbook.add_format({
-                    'bold': True,
-                    'text_wrap': True,
-                    'align': 'center',
-                    'valign': 'vcenter',
-                    'fg_color': '#4CAF50',
-                    'border': 1,
-                    'font_color': 'white'
-                })
-
-                for col_num, value in enumerate(df.columns.values):
-                    worksheet.write(0, col_num, value, header_format)
-
-            NotificationSystem(page).show_toast(f"تم تصدير قائمة الطلاب بنجاح إلى: {file_path}", "success")
+            file_path = STUDENTS_LIST_TEMPLATE.write(os.path.abspath("reports/students_list.xlsx"), data)
+
+            NotificationSystem.for_page(page).show_toast(f"تم تصدير قائمة الطلاب بنجاح إلى: {file_path}", "success")
             return file_path
         except Exception as e:
-            NotificationSystem(page).show_toast(f"خطأ في تصدير قائمة الطلاب: {str(e)}", "error")
+            NotificationSystem.for_page(page).show_toast(f"خطأ في تصدير قائمة الطلاب: {str(e)}", "error")
             return None
 
+    # واجهة async لنفس العمليات، تستخدمها معالجات الأحداث في App
+    add_group_async = in_executor(add_group)
+    add_student_async = in_executor(add_student)
+    delete_student_async = in_executor(delete_student)
+    delete_group_async = in_executor(delete_group)
+    edit_student_async = in_executor(edit_student)
+    edit_group_async = in_executor(edit_group)
+    record_attendance_async = in_executor(record_attendance)
+    record_attendance_many_async = in_executor(record_attendance_many)
+    import_attendance_from_media_async = in_executor(import_attendance_from_media)
+    evaluate_student_async = in_executor(evaluate_student)
+    delete_students_async = in_executor(delete_students)
+    move_students_async = in_executor(move_students)
+    evaluate_students_async = in_executor(evaluate_students)
+    print_qr_cards_async = in_executor(print_qr_cards)
+    scan_qr_code_async = in_executor(scan_qr_code)
+    kiosk_scan_async = in_executor(kiosk_scan)
+    generate_monthly_report_async = in_executor(generate_monthly_report)
+    generate_group_report_async = in_executor(generate_group_report)
+    export_students_list_async = in_executor(export_students_list)
+
+class GroupPicker(ft.Column):
+    # اختيار مجموعة بالكتابة: الاقتراحات تُحسب من فهرس المجموعات عند الكتابة فقط وبحد أقصى limit
+    def __init__(self, system, label="اختر المجموعة", limit=8):
+        self.system = system
+        self.limit = limit
+        self.selected = None
+        self.field = ft.TextField(
+            label=label,
+            prefix_icon=ft.icons.GROUP,
+            border_radius=10,
+            filled=True,
+            on_change=self.show_suggestions,
+            on_focus=self.show_suggestions
+        )
+        self.suggestions = ft.ListView(spacing=0, visible=False)
+        super().__init__([self.field, self.suggestions], spacing=0, expand=True)
+
+    @property
+    def value(self):
+        # الاسم المكتوب يدوياً مقبول أيضاً إذا كان اسم مجموعة موجودة
+        name = self.selected or (self.field.value or "").strip()
+        return name if self.system.find_group(name) else None
+
+    @value.setter
+    def value(self, group_name):
+        self.selected = group_name
+        self.field.value = group_name or ""
+        self.suggestions.controls = []
+        self.suggestions.visible = False
+
+    def show_suggestions(self, e=None):
+        self.selected = None
+        names = self.system.search_groups(self.field.value or "")
+        groups, total = self.system.get_groups_page(0, self.limit, names)
+        self.suggestions.controls = [
+            ft.ListTile(
+                title=ft.Text(group.name),
+                subtitle=ft.Text(f"{group.time} | {group.days}", size=12),
+                dense=True,
+                on_click=lambda e, name=group.name: self.select(name)
+            ) for group in groups
+        ]
+        if total > len(groups):
+            self.suggestions.controls.append(
+                ft.Text(f"و {total - len(groups)} مجموعة أخرى، اكتب جزءاً من الاسم للتصفية", size=12, color=ft.colors.GREY))
+        self.suggestions.visible = bool(self.suggestions.controls)
+        if self.page:
+            UpdateScheduler.for_page(self.page).mark_dirty(self.suggestions)
+
+    def select(self, group_name):
+        self.value = group_name
+        if self.page:
+            UpdateScheduler.for_page(self.page).mark_dirty(self)
+
+    def refresh(self):
+        # المجموعات تغيّرت (في هذه الجلسة أو غيرها): الاختيار المحذوف يُلغى والاقتراحات المفتوحة تُعاد
+        if self.selected and not self.system.find_group(self.selected):
+            self.value = None
+        elif self.suggestions.visible:
+            self.show_suggestions()
+            return
+        if self.page:
+            UpdateScheduler.for_page(self.page).mark_dirty(self)
+
 class App:
-    def __init__(self, page: ft.Page):
+    STUDENTS_PAGE_SIZE = 25
+    GROUPS_PAGE_SIZE = 20
+    # أعمدة جدول الطلاب القابلة للترتيب بنفس ترتيب ظهورها، و"إجراءات" غير قابل للترتيب
+    STUDENT_SORT_COLUMNS = (("id", "ID"), ("name", "الاسم"), ("group", "المجموعة"),
+                            ("attendance", "الحضور"), ("rating", "آخر تقييم"))
+    STUDENT_SORT_DEPTH = 3
+    # صفحات تعمل قبل اكتمال تحميل البيانات في الخلفية، وباقي الصفحات تُفتح بعد حدث data_loaded
+    EARLY_ROUTES = ("/", "/settings", "/help", "/attendance")
+    STARTUP_STAGE_LABELS = {
+        "interpreter_start": "بدء المفسّر",
+        "imports": "استيراد الوحدات الأساسية",
+        "module": "تحميل البرنامج",
+        "create_database": "إنشاء قاعدة البيانات",
+        "load_settings": "تحميل الإعدادات",
+        "load_data": "تحميل البيانات",
+        "first_paint": "أول عرض للقائمة الرئيسية"
+    }
+    GROUP_SORT_OPTIONS = {
+        "created": ("ترتيب الإضافة", []),
+        "name": ("الاسم (أ - ي)", [("name", False)]),
+        "name_desc": ("الاسم (ي - أ)", [("name", True)]),
+        "time": ("الموعد (الأبكر أولاً)", [("time", False), ("name", False)]),
+        "time_desc": ("الموعد (الأخير أولاً)", [("time", True), ("name", False)])
+    }
+
+    # كل جلسة لها App خاص بها (الصفحات، الحقول، البحث)، والبيانات نفسها مشتركة عبر AttendanceSystem.shared()
+    def __init__(self, page: ft.Page, system=None):
+        self.started = time.time()
         self.page = page
-        self.notification = NotificationSystem(page)
+        self.notification = NotificationSystem.for_page(page)
+        self.ui = UpdateScheduler.for_page(page)
         self.entry_student_id = ft.TextField()
         self.start_date_picker = ft.TextField()
         self.end_date_picker = ft.TextField()
         self.group_dropdown = ft.Dropdown()
         self.entry_report_id = ft.TextField()
         self.dark_mode = False
+        self.views = {}
+        self.data_controls = []
         self.load_settings()
         self.setup_page()
-        self.system = AttendanceSystem()
-        self.create_main_menu()
+        self.system = system or AttendanceSystem.shared()
+        self.system.subscribe(self.on_data_changed)
+        self.page.on_disconnect = self.on_page_disconnect
+        self.page.on_connect = self.on_page_connect
+        self.setup_routes()
+        self.page.go(self.page.route or "/")
     
+    @STARTUP.profiled("load_settings")
     def load_settings(self):
         try:
             conn = sqlite3.connect(DATABASE_FILE)
@@ -758,28 +2630,167 @@ class App:
             font_family="Tajawal"
         )
         self.page.theme_mode = ft.ThemeMode.LIGHT if not self.dark_mode else ft.ThemeMode.DARK
-        self.page.scroll = ft.ScrollMode.AUTO
         self.page.window_width = 1200
         self.page.window_height = 800
         self.page.window_min_width = 1000
         self.page.window_min_height = 700
         self.page.on_close = self.on_window_close
-        self.page.vertical_alignment = ft.MainAxisAlignment.START
-        self.page.horizontal_alignment = ft.CrossAxisAlignment.CENTER
-        self.page.padding = 20
-        self.page.bgcolor = ft.colors.GREY_50 if not self.dark_mode else ft.colors.GREY_900
-    
+        for view in self.views.values():
+            self.style_view(view)
+
+    def style_view(self, view):
+        view.scroll = ft.ScrollMode.AUTO
+        view.vertical_alignment = ft.MainAxisAlignment.START
+        view.horizontal_alignment = ft.CrossAxisAlignment.CENTER
+        view.padding = 20
+        view.bgcolor = ft.colors.GREY_50 if not self.dark_mode else ft.colors.GREY_900
+
+    def setup_routes(self):
+        # كل مسار: (دالة بناء الصفحة مرة واحدة، دالة تحديث الأجزاء المرتبطة بالبيانات عند كل زيارة)
+        self.routes = {
+            "/": (self.build_main_menu_view, None),
+            "/settings": (self.build_settings_view, self.refresh_settings_view),
+            "/groups/add": (self.build_add_group_view, self.refresh_add_group_view),
+            "/groups": (self.build_manage_groups_view, self.refresh_manage_groups_view),
+            "/groups/edit": (self.build_edit_group_view, self.refresh_edit_group_view),
+            "/students/add": (self.build_add_student_view, self.refresh_add_student_view),
+            "/students": (self.build_manage_students_view, self.refresh_manage_students_view),
+            "/students/edit": (self.build_edit_student_view, self.refresh_edit_student_view),
+            "/students/evaluate": (self.build_evaluate_student_view, self.refresh_evaluate_student_view),
+            "/attendance": (self.build_record_attendance_view, self.refresh_record_attendance_view),
+            "/reports/monthly": (self.build_generate_report_view, None),
+            "/reports/group": (self.build_group_report_view, self.refresh_group_report_view),
+            "/help": (self.build_how_to_use_view, None)
+        }
+        self.page.on_route_change = self.on_route_change
+        self.page.on_view_pop = lambda e: self.create_main_menu()
+
+    def navigate(self, route):
+        self.page.go(route)
+
+    def is_view_visible(self, route):
+        return bool(self.page.views) and self.page.views[-1] is self.views.get(route)
+
+    def on_data_changed(self, event, students):
+        if event == "data_loaded":
+            self.enable_data_features()
+            return
+        # الصفحات المحفوظة تُرقَّع في مكانها: صف واحد لكل تعديل بدلاً من إعادة بناء الصفحة
+        if event == "groups_changed":
+            for name in ("group_dropdown", "edit_student_group", "group_report_dropdown"):
+                picker = getattr(self, name, None)
+                if isinstance(picker, GroupPicker):
+                    picker.refresh()
+        elif "/students" in self.views:
+            self.patch_students_view(event, students)
+        if "/groups" in self.views and event in ("groups_changed", "student_removed"):
+            self.groups_filter_names = self.system.search_groups(self.groups_search_field.value or "")
+            self.load_groups_page(update=self.is_view_visible("/groups"))
+        if "/attendance" in self.views:
+            self.refresh_record_attendance_view()
+            if self.is_view_visible("/attendance"):
+                self.ui.mark_dirty(self.attendance_present_label, self.attendance_absent_label)
+
+    def data_control(self, control):
+        # عنصر يحتاج البيانات كاملة: معطّل حتى data_loaded. التسجيل يسبق فحص ready، فلا يفوته الحدث أبداً
+        self.data_controls.append(control)
+        ready = self.system.ready.is_set()
+        control.disabled = not ready
+        control.opacity = 1 if ready else 0.5
+        return control
+
+    def enable_data_features(self):
+        for control in self.data_controls:
+            control.disabled = False
+            control.opacity = 1
+        dirty = list(self.data_controls)
+        # الشريط قد يكون قيد البناء ولم تُحفظ الصفحة "/" بعد، فنخفيه متى وُجد ونرسله فقط إن كانت الصفحة معروضة
+        if getattr(self, "loading_banner", None):
+            self.loading_banner.visible = False
+            if "/" in self.views:
+                dirty.append(self.loading_banner)
+        if "/attendance" in self.views:
+            self.refresh_record_attendance_view()
+            dirty += [self.attendance_present_label, self.attendance_absent_label]
+        if dirty:
+            self.ui.mark_dirty(*dirty)
+
+    def get_view(self, route):
+        # الصفحة تُبنى مرة واحدة فقط ثم يُعاد استخدامها
+        view = self.views.get(route)
+        if view is None:
+            build, _ = self.routes[route]
+            view = ft.View(route, [build()])
+            self.style_view(view)
+            self.views[route] = view
+        return view
+
+    def on_route_change(self, e):
+        route, argument = e.route.rstrip("/") or "/", None
+        if route not in self.routes:
+            route, _, argument = route.rpartition("/")
+            argument = unquote(argument)
+            if route not in self.routes:
+                route, argument = "/", None
+        if route not in self.EARLY_ROUTES and not self.system.ready.is_set():
+            self.notification.show_toast("جارٍ تحميل البيانات، حاول بعد لحظات", "info")
+            route, argument = "/", None
+
+        view = self.get_view(route)
+        _, refresh = self.routes[route]
+        if refresh and refresh(argument) is False:
+            return
+
+        # القائمة الرئيسية تبقى دائماً أسفل المكدس، فالرجوع إليها لا يعيد إرسال أي شيء
+        views = [self.get_view("/")]
+        if route != "/":
+            views.append(view)
+        self.page.views[:] = views
+        self.ui.flush_now()
+        # من إنشاء أول جلسة حتى إرسال أول صفحة لها
+        STARTUP.record_once("first_paint", self.started)
+
     def toggle_dark_mode(self, e=None):
         self.dark_mode = not self.dark_mode
         self.save_settings()
         self.setup_page()
-        self.page.update()
+        self.dark_mode_button.icon = ft.icons.DARK_MODE if not self.dark_mode else ft.icons.LIGHT_MODE
+        if "/settings" in self.views:
+            self.dark_mode_switch.value = self.dark_mode
+        self.ui.flush_now()
         self.notification.show_toast(f"تم تفعيل الوضع {'الداكن' if self.dark_mode else 'الفاتح'}", "success")
     
-    def on_window_close(self):
-        cv2.destroyAllWindows()
-        self.page.window_destroy()
+    def on_page_disconnect(self, e=None):
+        # في وضع الويب لا يصل on_close إلا بعد انتهاء الجلسة (ساعة افتراضياً)، فنتوقف عن استقبال الأحداث من الآن
+        self.system.unsubscribe(self.on_data_changed)
+
+    def on_page_connect(self, e=None):
+        # عادت الجلسة: الأحداث التي فاتتها أثناء الانقطاع لن تصل، فنعيد بناء الصفحات المحفوظة من البيانات الحالية
+        self.system.subscribe(self.on_data_changed)
+        if self.system.ready.is_set():
+            self.enable_data_features()
+        if "/students" in self.views:
+            if self.students_filter_ids is not None:
+                self.students_filter_ids = self.system.search_students(self.students_search_field.value)
+            self.students_selected &= set(self.system.students_by_id)
+            visible = self.is_view_visible("/students")
+            self.update_students_bulk_bar(update=visible)
+            self.load_students_page(update=visible)
+        self.on_data_changed("groups_changed", [])
+        self.ui.flush_now()
+
+    def on_window_close(self, e=None):
+        # في وضع الويب يعني هذا انتهاء جلسة واحدة فقط، فلا نغلق الكاميرا المشتركة
+        self.system.unsubscribe(self.on_data_changed)
+        if not self.page.web:
+            CameraSession.shared().close()
+            self.page.window_destroy()
     
+    def close_dialog(self):
+        if self.page.dialog:
+            self.page.dialog.open = False
+            self.ui.flush_now()
+
     def show_about_dialog(self, e=None):
         about_content = ft.Column([
             ft.Text("SmartAttendance", size=24, weight=ft.FontWeight.BOLD),
@@ -810,11 +2821,12 @@ class App:
         
         self.page.dialog = about_dialog
         about_dialog.open = True
-        self.page.update()
+        self.ui.flush_now()
     
     def show_settings_page(self, e=None):
-        self.page.clean()
-        
+        self.navigate("/settings")
+
+    def build_settings_view(self):
         header = ft.Container(
             content=ft.Row([
                 ft.Icon(ft.icons.SETTINGS, size=30, color=ft.colors.WHITE),
@@ -826,7 +2838,7 @@ class App:
             width=self.page.width
         )
         
-        dark_mode_switch = ft.Switch(
+        self.dark_mode_switch = ft.Switch(
             label="الوضع الداكن",
             value=self.dark_mode,
             on_change=self.toggle_dark_mode
@@ -846,7 +2858,7 @@ class App:
             content=ft.Container(
                 content=ft.Column([
                     ft.Text("الإعدادات العامة:", size=18, weight=ft.FontWeight.BOLD),
-                    dark_mode_switch,
+                    self.dark_mode_switch,
                     language_dropdown,
                     ft.Divider(),
                     ft.Text("حول البرنامج:", size=18, weight=ft.FontWeight.BOLD),
@@ -862,6 +2874,27 @@ class App:
             width=self.page.width
         )
         
+        self.startup_timeline = ft.Column(spacing=5)
+        startup_card = ft.Card(
+            content=ft.Container(
+                content=ft.Column([
+                    ft.Row([
+                        ft.Text("زمن بدء التشغيل:", size=18, weight=ft.FontWeight.BOLD),
+                        ft.Container(expand=True),
+                        ft.OutlinedButton(
+                            "حفظ كملف JSON",
+                            icon=ft.icons.SAVE_ALT,
+                            on_click=self.dump_startup_profile
+                        )
+                    ]),
+                    self.startup_timeline
+                ], spacing=15),
+                padding=20
+            ),
+            elevation=5,
+            width=self.page.width
+        )
+        
         footer = ft.Container(
             content=ft.Row([
                 ft.OutlinedButton(
@@ -877,21 +2910,55 @@ class App:
             padding=10
         )
         
-        self.page.add(
-            ft.Column([
-                header,
-                ft.Divider(height=20),
-                settings_form,
-                footer
-            ],
-            spacing=0,
-            scroll=ft.ScrollMode.AUTO)
-        )
-        
-        self.page.update()
+        return ft.Column([
+            header,
+            ft.Divider(height=20),
+            settings_form,
+            ft.Divider(height=20),
+            startup_card,
+            footer
+        ],
+        spacing=0,
+        scroll=ft.ScrollMode.AUTO)
     
+    def refresh_settings_view(self, argument=None):
+        report = STARTUP.report()
+        entries = report["stages"] + [
+            {**entry, "name": f"import {entry['name']}"} for entry in report["imports"]
+        ]
+        longest = max([entry["duration_ms"] for entry in entries] + [1])
+        self.startup_timeline.controls = [
+            ft.Row([
+                ft.Text(self.STARTUP_STAGE_LABELS.get(entry["name"], entry["name"]), width=220),
+                ft.Text(f"+{entry['start_ms']:.0f} ms", width=90, color=ft.colors.GREY),
+                ft.ProgressBar(value=entry["duration_ms"] / longest, width=200, color=ft.colors.TEAL),
+                ft.Text(f"{entry['duration_ms']:.0f} ms", width=80),
+                ft.Text(entry["thread"], size=12, color=ft.colors.GREY)
+            ]) for entry in entries
+        ]
+        if not report["origin_is_process_start"]:
+            self.startup_timeline.controls.append(
+                ft.Text("الأوقات محسوبة من بداية تحميل البرنامج (وقت بدء العملية غير متاح على هذا النظام)",
+                        size=12, color=ft.colors.GREY)
+            )
+
+    def dump_startup_profile(self, e=None):
+        try:
+            file_path = STARTUP.dump()
+            self.notification.show_toast(f"تم حفظ ملف زمن التشغيل في: {os.path.abspath(file_path)}", "success")
+        except Exception as ex:
+            self.notification.show_toast(f"حدث خطأ أثناء حفظ الملف: {str(ex)}", "error")
+
     def create_main_menu(self):
-        self.page.clean()
+        self.navigate("/")
+
+    def build_main_menu_view(self):
+        self.dark_mode_button = ft.IconButton(
+            icon=ft.icons.DARK_MODE if not self.dark_mode else ft.icons.LIGHT_MODE,
+            on_click=self.toggle_dark_mode,
+            tooltip="تبديل الوضع الداكن/الفاتح",
+            icon_color=ft.colors.WHITE
+        )
         
         header = ft.Container(
             content=ft.Row([
@@ -901,12 +2968,7 @@ class App:
                        weight=ft.FontWeight.BOLD,
                        color=ft.colors.WHITE),
                 ft.Container(expand=True),
-                ft.IconButton(
-                    icon=ft.icons.DARK_MODE if not self.dark_mode else ft.icons.LIGHT_MODE,
-                    on_click=self.toggle_dark_mode,
-                    tooltip="تبديل الوضع الداكن/الفاتح",
-                    icon_color=ft.colors.WHITE
-                )
+                self.dark_mode_button
             ]),
             padding=20,
             bgcolor=ft.colors.TEAL,
@@ -914,54 +2976,75 @@ class App:
             width=self.page.width
         )
         
+        # شريط التحميل بدلاً من شاشة بيضاء: القائمة تظهر فوراً وتُفعَّل البطاقات عند اكتمال البيانات
+        self.loading_banner = ft.Container(
+            content=ft.Row([
+                ft.ProgressRing(width=20, height=20, stroke_width=2),
+                ft.Text("جارٍ تحميل بيانات الطلاب والمجموعات... يمكنك تسجيل الحضور يدوياً الآن", size=14)
+            ], spacing=10),
+            padding=10,
+            border_radius=10,
+            bgcolor=ft.colors.TEAL_50
+        )
+        # مثل data_control: الإسناد يسبق فحص ready، فإما أن يراه حدث data_loaded أو يرى هذا الفحص ready
+        self.loading_banner.visible = not self.system.ready.is_set()
+        
         menu_cards = [
             {
                 "title": "إضافة مجموعة",
                 "icon": ft.icons.GROUP_ADD,
                 "color": ft.colors.TEAL_300,
-                "action": self.add_group_page
+                "action": self.add_group_page,
+                "route": "/groups/add"
             },
             {
                 "title": "إضافة طالب",
                 "icon": ft.icons.PERSON_ADD,
                 "color": ft.colors.CYAN_300,
-                "action": self.add_student_page
+                "action": self.add_student_page,
+                "route": "/students/add"
             },
             {
                 "title": "إدارة المجموعات",
                 "icon": ft.icons.GROUP,
                 "color": ft.colors.AMBER_300,
-                "action": self.manage_groups_page
+                "action": self.manage_groups_page,
+                "route": "/groups"
             },
             {
                 "title": "إدارة الطلاب",
                 "icon": ft.icons.PEOPLE,
                 "color": ft.colors.PURPLE_300,
-                "action": self.manage_students_page
+                "action": self.manage_students_page,
+                "route": "/students"
             },
             {
                 "title": "تسجيل الحضور",
                 "icon": ft.icons.CHECK_CIRCLE,
                 "color": ft.colors.LIGHT_GREEN_300,
-                "action": self.record_attendance_page
+                "action": self.record_attendance_page,
+                "route": "/attendance"
             },
             {
                 "title": "التقرير الشهري",
                 "icon": ft.icons.ASSIGNMENT,
                 "color": ft.colors.INDIGO_300,
-                "action": self.generate_report_page
+                "action": self.generate_report_page,
+                "route": "/reports/monthly"
             },
             {
                 "title": "تقرير المجموعة",
                 "icon": ft.icons.ANALYTICS,
                 "color": ft.colors.BLUE_GREY_300,
-                "action": self.group_report_page
+                "action": self.group_report_page,
+                "route": "/reports/group"
             },
             {
                 "title": "طريقة الاستخدام",
                 "icon": ft.icons.HELP,
                 "color": ft.colors.DEEP_ORANGE_300,
-                "action": self.how_to_use_page
+                "action": self.how_to_use_page,
+                "route": "/help"
             }
         ]
         
@@ -988,6 +3071,9 @@ class App:
                 ) for card in menu_cards
             ]
         )
+        for card, container in zip(menu_cards, cards_row.controls):
+            if card["route"] not in self.EARLY_ROUTES:
+                self.data_control(container)
         
         footer = ft.Container(
             content=ft.Row([
@@ -1005,24 +3091,22 @@ class App:
             width=self.page.width
         )
         
-        self.page.add(
-            ft.Column([
-                header,
-                ft.Divider(height=20, color=ft.colors.TRANSPARENT),
-                cards_row,
-                ft.Divider(height=20, color=ft.colors.TRANSPARENT),
-                footer
-            ], 
-            spacing=0,
-            expand=True,
-            scroll=ft.ScrollMode.AUTO)
-        )
-        
-        self.page.update()
+        return ft.Column([
+            header,
+            ft.Divider(height=20, color=ft.colors.TRANSPARENT),
+            self.loading_banner,
+            cards_row,
+            ft.Divider(height=20, color=ft.colors.TRANSPARENT),
+            footer
+        ], 
+        spacing=0,
+        expand=True,
+        scroll=ft.ScrollMode.AUTO)
 
     def add_group_page(self, e=None):
-        self.page.clean()
-        
+        self.navigate("/groups/add")
+
+    def build_add_group_view(self):
         header = ft.Container(
             content=ft.Row([
                 ft.Icon(ft.icons.GROUP_ADD, size=30, color=ft.colors.WHITE),
@@ -1090,21 +3174,23 @@ class App:
             )
         ], spacing=20, alignment=ft.MainAxisAlignment.END)
         
-        self.page.add(
-            ft.Column([
-                header,
-                ft.Divider(height=20),
-                form,
-                ft.Divider(height=20),
-                controls
-            ],
-            spacing=0,
-            scroll=ft.ScrollMode.AUTO)
-        )
-        
-        self.page.update()
+        return ft.Column([
+            header,
+            ft.Divider(height=20),
+            form,
+            ft.Divider(height=20),
+            controls
+        ],
+        spacing=0,
+        scroll=ft.ScrollMode.AUTO)
+
+    def refresh_add_group_view(self, argument=None):
+        self.entry_name.value = ""
+        self.entry_time.value = ""
+        for checkbox in self.day_checkboxes:
+            checkbox.value = False
 
-    def save_group(self, e):
+    async def save_group(self, e):
         name = self.entry_name.value.strip()
         time = self.entry_time.value.strip()
         selected_days = [day.label for day in self.day_checkboxes if day.value]
@@ -1122,12 +3208,13 @@ class App:
             self.notification.show_toast("يجب اختيار يوم واحد على الأقل!", "error")
             return
         
-        if self.system.add_group(name, time, days, self.page):
+        if await self.system.add_group_async(name, time, days, self.page):
             self.create_main_menu()
 
     def add_student_page(self, e=None):
-        self.page.clean()
-        
+        self.navigate("/students/add")
+
+    def build_add_student_view(self):
         header = ft.Container(
             content=ft.Row([
                 ft.Icon(ft.icons.PERSON_ADD, size=30, color=ft.colors.WHITE),
@@ -1156,20 +3243,7 @@ class App:
             expand=True
         )
         
-        groups = [group.name for group in self.system.groups]
-        if not groups:
-            self.notification.show_toast("لا توجد مجموعات متاحة! يرجى إضافة مجموعة أولاً.", "error")
-            self.create_main_menu()
-            return
-            
-        self.group_dropdown = ft.Dropdown(
-            label="اختر المجموعة",
-            prefix_icon=ft.icons.GROUP,
-            options=[ft.dropdown.Option(group) for group in groups],
-            border_radius=10,
-            filled=True,
-            expand=True
-        )
+        self.group_dropdown = GroupPicker(self.system)
         
         form = ft.Card(
             content=ft.Container(
@@ -1205,21 +3279,27 @@ class App:
             )
         ], spacing=20, alignment=ft.MainAxisAlignment.END)
         
-        self.page.add(
-            ft.Column([
-                header,
-                ft.Divider(height=20),
-                form,
-                ft.Divider(height=20),
-                controls
-            ],
-            spacing=0,
-            scroll=ft.ScrollMode.AUTO)
-        )
+        return ft.Column([
+            header,
+            ft.Divider(height=20),
+            form,
+            ft.Divider(height=20),
+            controls
+        ],
+        spacing=0,
+        scroll=ft.ScrollMode.AUTO)
+
+    def refresh_add_student_view(self, argument=None):
+        if not self.system.groups:
+            self.notification.show_toast("لا توجد مجموعات متاحة! يرجى إضافة مجموعة أولاً.", "error")
+            self.create_main_menu()
+            return False
         
-        self.page.update()
+        self.entry_student_name.value = ""
+        self.entry_phone.value = ""
+        self.group_dropdown.value = None
 
-    def save_student(self, e):
+    async def save_student(self, e):
         name = self.entry_student_name.value.strip()
         phone = self.entry_phone.value.strip()
         group = self.group_dropdown.value
@@ -1236,24 +3316,39 @@ class App:
             self.notification.show_toast("يجب اختيار المجموعة!", "error")
             return
         
-        if self.system.add_student(name, phone, group, self.page):
+        if await self.system.add_student_async(name, phone, group, self.page):
             self.create_main_menu()
 
     def manage_groups_page(self, e=None):
-        self.page.clean()
-        
-        if not self.system.groups:
-            self.notification.show_toast("لا توجد مجموعات متاحة!", "error")
-            self.create_main_menu()
-            return
-            
+        self.navigate("/groups")
+
+    def build_manage_groups_view(self):
+        self.groups_filter_names = None
+        self.groups_page_index = 0
+        self.groups_order = []
+        self.groups_sort_dropdown = ft.Dropdown(
+            width=200,
+            height=40,
+            content_padding=5,
+            value="created",
+            options=[ft.dropdown.Option(key, label) for key, (label, _) in self.GROUP_SORT_OPTIONS.items()],
+            on_change=self.sort_groups
+        )
+        self.groups_count_label = ft.Text("", size=16, color=ft.colors.WHITE)
+        self.groups_search_field = ft.TextField(
+            width=300,
+            height=40,
+            hint_text="ابحث عن مجموعة...",
+            on_change=self.filter_groups
+        )
         header = ft.Container(
             content=ft.Row([
                 ft.Icon(ft.icons.GROUP, size=30, color=ft.colors.WHITE),
                 ft.Text("إدارة المجموعات", size=24, color=ft.colors.WHITE),
                 ft.Container(expand=True),
-                ft.Text(f"عدد المجموعات: {len(self.system.groups)}", 
-                       size=16, color=ft.colors.WHITE)
+                self.groups_search_field,
+                self.groups_sort_dropdown,
+                self.groups_count_label
             ]),
             padding=15,
             bgcolor=ft.colors.AMBER_300,
@@ -1261,45 +3356,24 @@ class App:
             width=self.page.width
         )
         
-        groups_list = ft.ListView(expand=True, spacing=10)
-        
-        for group in self.system.groups:
-            group_card = ft.Card(
-                content=ft.Container(
-                    content=ft.Column([
-                        ft.ListTile(
-                            leading=ft.Icon(ft.icons.GROUP, color=ft.colors.AMBER),
-                            title=ft.Text(group.name, weight=ft.FontWeight.BOLD),
-                            subtitle=ft.Text(f"الوقت: {group.time} | الأيام: {group.days}"),
-                        ),
-                        ft.Row([
-                            ft.FilledButton(
-                                "تعديل",
-                                icon=ft.icons.EDIT,
-                                on_click=lambda e, g=group.name: self.edit_group_page(g),
-                                style=ft.ButtonStyle(
-                                    shape=ft.RoundedRectangleBorder(radius=10),
-                                    padding=10
-                                )
-                            ),
-                            ft.FilledButton(
-                                "حذف",
-                                icon=ft.icons.DELETE,
-                                on_click=lambda e, g=group.name: self.delete_group(g),
-                                style=ft.ButtonStyle(
-                                    shape=ft.RoundedRectangleBorder(radius=10),
-                                    padding=10,
-                                    bgcolor=ft.colors.RED
-                                )
-                            )
-                        ], spacing=10)
-                    ]),
-                    padding=10,
-                    border_radius=ft.border_radius.all(10)
-                ),
-                elevation=5
-            )
-            groups_list.controls.append(group_card)
+        # القائمة تعرض صفحة واحدة من المجموعات فقط مهما زاد عددها
+        self.groups_list = ft.ListView(expand=True, spacing=10)
+        self.groups_page_label = ft.Text("", size=14)
+        self.groups_prev_button = ft.IconButton(
+            icon=ft.icons.CHEVRON_RIGHT,
+            tooltip="الصفحة السابقة",
+            on_click=lambda e: self.change_groups_page(-1)
+        )
+        self.groups_next_button = ft.IconButton(
+            icon=ft.icons.CHEVRON_LEFT,
+            tooltip="الصفحة التالية",
+            on_click=lambda e: self.change_groups_page(1)
+        )
+        groups_pager = ft.Row([
+            self.groups_prev_button,
+            self.groups_page_label,
+            self.groups_next_button
+        ], alignment=ft.MainAxisAlignment.CENTER)
         
         footer = ft.Container(
             content=ft.Row([
@@ -1316,45 +3390,130 @@ class App:
             padding=10
         )
         
-        self.page.add(
-            ft.Column([
-                header,
-                ft.Divider(height=20),
-                ft.Container(
-                    content=groups_list,
-                    border_radius=10,
-                    padding=10,
-                    bgcolor=ft.colors.WHITE,
-                    shadow=ft.BoxShadow(
-                        spread_radius=1,
-                        blur_radius=5,
-                        color=ft.colors.GREY_300,
-                        offset=ft.Offset(0, 0)
-                    ),
-                    expand=True
+        return ft.Column([
+            header,
+            ft.Divider(height=20),
+            ft.Container(
+                content=ft.Column([self.groups_list, groups_pager], expand=True),
+                border_radius=10,
+                padding=10,
+                bgcolor=ft.colors.WHITE,
+                shadow=ft.BoxShadow(
+                    spread_radius=1,
+                    blur_radius=5,
+                    color=ft.colors.GREY_300,
+                    offset=ft.Offset(0, 0)
                 ),
-                footer
-            ],
-            spacing=0,
-            expand=True,
-            scroll=ft.ScrollMode.AUTO)
+                expand=True
+            ),
+            footer
+        ],
+        spacing=0,
+        expand=True,
+        scroll=ft.ScrollMode.AUTO)
+
+    def build_group_card(self, group):
+        return ft.Card(
+            content=ft.Container(
+                content=ft.Column([
+                    ft.ListTile(
+                        leading=ft.Icon(ft.icons.GROUP, color=ft.colors.AMBER),
+                        title=ft.Text(group.name, weight=ft.FontWeight.BOLD),
+                        subtitle=ft.Text(f"الوقت: {group.time} | الأيام: {group.days}"),
+                    ),
+                    ft.Row([
+                        ft.FilledButton(
+                            "تعديل",
+                            icon=ft.icons.EDIT,
+                            on_click=lambda e, g=group.name: self.edit_group_page(g),
+                            style=ft.ButtonStyle(
+                                shape=ft.RoundedRectangleBorder(radius=10),
+                                padding=10
+                            )
+                        ),
+                        ft.FilledButton(
+                            "حذف",
+                            icon=ft.icons.DELETE,
+                            on_click=lambda e, g=group.name: self.delete_group(g),
+                            style=ft.ButtonStyle(
+                                shape=ft.RoundedRectangleBorder(radius=10),
+                                padding=10,
+                                bgcolor=ft.colors.RED
+                            )
+                        ),
+                        ft.OutlinedButton(
+                            "بطاقات QR",
+                            icon=ft.icons.QR_CODE,
+                            on_click=lambda e, g=group.name: self.page.run_task(self.print_qr_cards, g),
+                            style=ft.ButtonStyle(
+                                shape=ft.RoundedRectangleBorder(radius=10),
+                                padding=10
+                            )
+                        )
+                    ], spacing=10)
+                ]),
+                padding=10,
+                border_radius=ft.border_radius.all(10)
+            ),
+            elevation=5
         )
+
+    def refresh_manage_groups_view(self, argument=None):
+        if not self.system.groups:
+            self.notification.show_toast("لا توجد مجموعات متاحة!", "error")
+            self.create_main_menu()
+            return False
         
-        self.page.update()
+        # المجموعات قد تكون تغيرت منذ آخر زيارة، فنعيد تطبيق البحث الحالي
+        self.groups_filter_names = self.system.search_groups(self.groups_search_field.value or "")
+        self.load_groups_page()
+
+    def load_groups_page(self, update=False):
+        size = self.GROUPS_PAGE_SIZE
+        filter_names = self.groups_filter_names
+        groups, total = self.system.get_groups_page(self.groups_page_index * size, size, filter_names, self.groups_order)
+        page_count = max(1, -(-total // size))
+        if self.groups_page_index >= page_count:
+            self.groups_page_index = page_count - 1
+            groups, total = self.system.get_groups_page(self.groups_page_index * size, size, filter_names, self.groups_order)
+
+        if filter_names is None:
+            self.groups_count_label.value = f"عدد المجموعات: {total}"
+        else:
+            self.groups_count_label.value = f"نتائج البحث: {total} من {len(self.system.groups)}"
+
+        self.groups_list.controls = [self.build_group_card(group) for group in groups]
+        self.groups_page_label.value = f"صفحة {self.groups_page_index + 1} من {page_count}"
+        self.groups_prev_button.disabled = self.groups_page_index == 0
+        self.groups_next_button.disabled = self.groups_page_index >= page_count - 1
+        if update:
+            self.ui.mark_dirty(self.groups_list, self.groups_count_label, self.groups_page_label,
+                               self.groups_prev_button, self.groups_next_button)
+
+    def change_groups_page(self, step):
+        self.groups_page_index = max(0, self.groups_page_index + step)
+        self.load_groups_page(update=True)
+
+    def sort_groups(self, e):
+        self.groups_order = self.GROUP_SORT_OPTIONS[e.control.value][1]
+        self.groups_page_index = 0
+        self.load_groups_page(update=True)
+
+    def filter_groups(self, e):
+        # فهرس المجموعات سريع بما يكفي للتصفية مع كل حرف دون تأخير
+        self.groups_filter_names = self.system.search_groups(e.control.value)
+        self.groups_page_index = 0
+        self.load_groups_page(update=True)
 
     def edit_group_page(self, group_name):
-        self.page.clean()
-        
-        group = next((g for g in self.system.groups if g.name == group_name), None)
-        if not group:
-            self.notification.show_toast("المجموعة غير موجودة!", "error")
-            self.manage_groups_page()
-            return
-        
+        self.navigate("/groups/edit/" + quote(group_name, safe=""))
+
+    def build_edit_group_view(self):
+        self.edit_group_title = ft.Text("", size=24, color=ft.colors.WHITE)
         header = ft.Container(
             content=ft.Row([
                 ft.Icon(ft.icons.EDIT, size=30, color=ft.colors.WHITE),
-                ft.Text(f"تعديل المجموعة: {group_name}", size=24, color=ft.colors.WHITE)
+                self.edit_group_title
             ]),
             padding=15,
             bgcolor=ft.colors.TEAL_300,
@@ -1362,37 +3521,35 @@ class App:
             width=self.page.width
         )
         
-        self.entry_name = ft.TextField(
+        # حقول منفصلة عن صفحة الإضافة لأن الصفحتين محفوظتان معاً
+        self.edit_group_name = ft.TextField(
             label="اسم المجموعة",
             prefix_icon=ft.icons.TEXT_FIELDS,
             border_radius=10,
             filled=True,
-            value=group.name,
             expand=True
         )
         
-        self.entry_time = ft.TextField(
+        self.edit_group_time = ft.TextField(
             label="وقت المجموعة",
             prefix_icon=ft.icons.ACCESS_TIME,
             border_radius=10,
             filled=True,
-            value=group.time,
             expand=True
         )
         
         days = ["السبت", "الأحد", "الاثنين", "الثلاثاء", "الأربعاء", "الخميس", "الجمعة"]
-        current_days = group.days.split(',')
-        self.day_checkboxes = [
-            ft.Checkbox(label=day, value=day in current_days) for day in days
+        self.edit_group_days = [
+            ft.Checkbox(label=day, value=False) for day in days
         ]
         
         form = ft.Card(
             content=ft.Container(
                 content=ft.Column([
-                    self.entry_name,
-                    self.entry_time,
+                    self.edit_group_name,
+                    self.edit_group_time,
                     ft.Text("أيام المجموعة:", size=18),
-                    ft.Column(self.day_checkboxes, spacing=5)
+                    ft.Column(self.edit_group_days, spacing=5)
                 ], spacing=15),
                 padding=20
             ),
@@ -1404,7 +3561,7 @@ class App:
             ft.FilledButton(
                 text="حفظ التعديلات",
                 icon=ft.icons.SAVE,
-                on_click=lambda e: self.save_group_edit(group_name),
+                on_click=self.save_group_edit,
                 style=ft.ButtonStyle(
                     shape=ft.RoundedRectangleBorder(radius=10),
                     padding=20
@@ -1421,24 +3578,35 @@ class App:
             )
         ], spacing=20, alignment=ft.MainAxisAlignment.END)
         
-        self.page.add(
-            ft.Column([
-                header,
-                ft.Divider(height=20),
-                form,
-                ft.Divider(height=20),
-                controls
-            ],
-            spacing=0,
-            scroll=ft.ScrollMode.AUTO)
-        )
+        return ft.Column([
+            header,
+            ft.Divider(height=20),
+            form,
+            ft.Divider(height=20),
+            controls
+        ],
+        spacing=0,
+        scroll=ft.ScrollMode.AUTO)
+
+    def refresh_edit_group_view(self, group_name):
+        group = self.system.find_group(group_name)
+        if not group:
+            self.notification.show_toast("المجموعة غير موجودة!", "error")
+            self.manage_groups_page()
+            return False
         
-        self.page.update()
+        self.editing_group = group_name
+        self.edit_group_title.value = f"تعديل المجموعة: {group_name}"
+        self.edit_group_name.value = group.name
+        self.edit_group_time.value = group.time
+        current_days = group.days.split(',')
+        for checkbox in self.edit_group_days:
+            checkbox.value = checkbox.label in current_days
 
-    def save_group_edit(self, old_name):
-        new_name = self.entry_name.value.strip()
-        new_time = self.entry_time.value.strip()
-        selected_days = [day.label for day in self.day_checkboxes if day.value]
+    async def save_group_edit(self, e):
+        new_name = self.edit_group_name.value.strip()
+        new_time = self.edit_group_time.value.strip()
+        selected_days = [day.label for day in self.edit_group_days if day.value]
         new_days = ",".join(selected_days)
         
         if not new_name:
@@ -1453,19 +3621,19 @@ class App:
             self.notification.show_toast("يجب اختيار يوم واحد على الأقل!", "error")
             return
         
-        if self.system.edit_group(old_name, new_name, new_time, new_days, self.page):
+        if await self.system.edit_group_async(self.editing_group, new_name, new_time, new_days, self.page):
             self.manage_groups_page()
 
     def delete_group(self, group_name):
-        def confirm_delete(e):
-            if self.system.delete_group(group_name, self.page):
+        async def confirm_delete(e):
+            if await self.system.delete_group_async(group_name, self.page):
                 self.manage_groups_page()
             dlg_modal.open = False
-            self.page.update()
+            self.ui.flush_now()
         
         def cancel_delete(e):
             dlg_modal.open = False
-            self.page.update()
+            self.ui.flush_now()
         
         dlg_modal = ft.AlertDialog(
             modal=True,
@@ -1480,33 +3648,88 @@ class App:
         
         self.page.dialog = dlg_modal
         dlg_modal.open = True
-        self.page.update()
+        self.ui.flush_now()
 
     def manage_students_page(self, e=None):
-        self.page.clean()
-        
-        if not self.system.students:
-            self.notification.show_toast("لا يوجد طلاب مسجلين!", "error")
-            self.create_main_menu()
-            return
-            
+        self.navigate("/students")
+
+    def build_manage_students_view(self):
+        self.students_filter_ids = None
+        self.students_order = []
+        # التحديد محفوظ كمجموعة IDs، لذلك يبقى عند التنقل بين الصفحات أو تغيير البحث والترتيب
+        self.students_selected = set()
+        self.students_selected_label = ft.Text("", size=16, weight=ft.FontWeight.BOLD)
+        self.students_bulk_bar = ft.Container(
+            content=ft.Row([
+                ft.Icon(ft.icons.CHECKLIST, color=ft.colors.PURPLE),
+                self.students_selected_label,
+                ft.TextButton("تحديد كل النتائج", on_click=self.select_all_students),
+                ft.TextButton("إلغاء التحديد", on_click=self.clear_students_selection),
+                ft.Container(expand=True),
+                ft.FilledButton(
+                    "نقل إلى مجموعة",
+                    icon=ft.icons.DRIVE_FILE_MOVE,
+                    on_click=self.bulk_move_students,
+                    style=ft.ButtonStyle(
+                        shape=ft.RoundedRectangleBorder(radius=10),
+                        padding=10
+                    )
+                ),
+                ft.FilledButton(
+                    "تقييم",
+                    icon=ft.icons.STAR,
+                    on_click=self.bulk_evaluate_students,
+                    style=ft.ButtonStyle(
+                        shape=ft.RoundedRectangleBorder(radius=10),
+                        padding=10,
+                        bgcolor=ft.colors.AMBER
+                    )
+                ),
+                ft.FilledButton(
+                    "حذف",
+                    icon=ft.icons.DELETE,
+                    on_click=self.bulk_delete_students,
+                    style=ft.ButtonStyle(
+                        shape=ft.RoundedRectangleBorder(radius=10),
+                        padding=10,
+                        bgcolor=ft.colors.RED
+                    )
+                )
+            ]),
+            padding=10,
+            bgcolor=ft.colors.PURPLE_50,
+            border_radius=10,
+            visible=False
+        )
+        self.students_count_label = ft.Text("", size=16, color=ft.colors.WHITE)
+        self.students_sort_label = ft.Text("", size=14, color=ft.colors.WHITE)
+        self.students_search_field = ft.TextField(
+            width=300,
+            height=40,
+            hint_text="ابحث عن طالب...",
+            on_change=self.filter_students
+        )
         header = ft.Container(
             content=ft.Column([
                 ft.Row([
                     ft.Icon(ft.icons.PEOPLE, size=30, color=ft.colors.WHITE),
                     ft.Text("إدارة الطلاب", size=24, color=ft.colors.WHITE),
                     ft.Container(expand=True),
-                    ft.TextField(
-                        width=300,
-                        height=40,
-                        hint_text="ابحث عن طالب...",
-                        on_change=self.filter_students
-                    )
+                    self.students_search_field
                 ]),
                 ft.Row([
-                    ft.Text(f"عدد الطلاب: {len(self.system.students)}", 
-                           size=16, color=ft.colors.WHITE),
+                    self.students_count_label,
+                    self.students_sort_label,
                     ft.Container(expand=True),
+                    ft.FilledButton(
+                        "بطاقات QR",
+                        icon=ft.icons.QR_CODE,
+                        on_click=lambda e: self.page.run_task(self.print_qr_cards),
+                        style=ft.ButtonStyle(
+                            shape=ft.RoundedRectangleBorder(radius=10),
+                            padding=10
+                        )
+                    ),
                     ft.FilledButton(
                         "تصدير القائمة",
                         icon=ft.icons.DOWNLOAD,
@@ -1524,58 +3747,15 @@ class App:
             width=self.page.width
         )
         
-        students_table = ft.DataTable(
+        # الجدول يعرض صفحة واحدة فقط من الطلاب، لذلك يبقى حجمه ثابتاً مهما زاد عدد الطلاب
+        self.students_page_index = 0
+        self.students_table = ft.DataTable(
             columns=[
-                ft.DataColumn(ft.Text("ID")),
-                ft.DataColumn(ft.Text("الاسم")),
-                ft.DataColumn(ft.Text("المجموعة")),
-                ft.DataColumn(ft.Text("الحضور")),
-                ft.DataColumn(ft.Text("آخر تقييم")),
-                ft.DataColumn(ft.Text("إجراءات"))
-            ],
-            rows=[
-                ft.DataRow(
-                    cells=[
-                        ft.DataCell(ft.Text(student.id)),
-                        ft.DataCell(ft.Text(student.name)),
-                        ft.DataCell(ft.Text(student.group)),
-                        ft.DataCell(ft.Text(f"{len(student.attendance)} يوم")),
-                        ft.DataCell(
-                            ft.Row([
-                                ft.Icon(ft.icons.STAR, 
-                                    color=ft.colors.AMBER, 
-                                    size=16) for _ in range(
-                                        int(student.evaluation.get(
-                                            max(student.evaluation.keys(), "")
-                                                ).get("stars", 0))
-                                    )
-                            ]) if student.evaluation else ft.Text("بدون")
-                        ),
-                        ft.DataCell(
-                            ft.Row([
-                                ft.IconButton(
-                                    icon=ft.icons.EDIT,
-                                    icon_color=ft.colors.BLUE,
-                                    tooltip="تعديل",
-                                    on_click=lambda e, s=student.id: self.edit_student_page(s)
-                                ),
-                                ft.IconButton(
-                                    icon=ft.icons.STAR,
-                                    icon_color=ft.colors.AMBER,
-                                    tooltip="تقييم",
-                                    on_click=lambda e, s=student.id: self.evaluate_student_page(s)
-                                ),
-                                ft.IconButton(
-                                    icon=ft.icons.DELETE,
-                                    icon_color=ft.colors.RED,
-                                    tooltip="حذف",
-                                    on_click=lambda e, s=student.id: self.delete_student(s)
-                                )
-                            ], spacing=5)
-                        )
-                    ]
-                ) for student in self.system.students
-            ],
+                ft.DataColumn(ft.Text(label), numeric=field in ("attendance", "rating"), on_sort=self.sort_students)
+                for field, label in self.STUDENT_SORT_COLUMNS
+            ] + [ft.DataColumn(ft.Text("إجراءات"))],
+            show_checkbox_column=True,
+            on_select_all=self.select_students_page,
             border=ft.border.all(1, ft.colors.GREY_300),
             border_radius=10,
             vertical_lines=ft.border.BorderSide(1, ft.colors.GREY_300),
@@ -1585,6 +3765,23 @@ class App:
             data_row_min_height=60,
             expand=True
         )
+        self.students_page_label = ft.Text("", size=14)
+        self.students_prev_button = ft.IconButton(
+            icon=ft.icons.CHEVRON_RIGHT,
+            tooltip="الصفحة السابقة",
+            on_click=lambda e: self.change_students_page(-1)
+        )
+        self.students_next_button = ft.IconButton(
+            icon=ft.icons.CHEVRON_LEFT,
+            tooltip="الصفحة التالية",
+            on_click=lambda e: self.change_students_page(1)
+        )
+        pager = ft.Row([
+            self.students_prev_button,
+            self.students_page_label,
+            self.students_next_button
+        ], alignment=ft.MainAxisAlignment.CENTER)
+        self.load_students_page()
         
         footer = ft.Container(
             content=ft.Row([
@@ -1601,60 +3798,348 @@ class App:
             padding=10
         )
         
-        self.page.add(
-            ft.Column([
-                header,
-                ft.Divider(height=20),
-                ft.Container(
-                    content=students_table,
-                    border_radius=10,
-                    padding=10,
-                    bgcolor=ft.colors.WHITE,
-                    shadow=ft.BoxShadow(
-                        spread_radius=1,
-                        blur_radius=5,
-                        color=ft.colors.GREY_300,
-                        offset=ft.Offset(0, 0)
-                    ),
-                    expand=True
+        return ft.Column([
+            header,
+            ft.Divider(height=20),
+            ft.Container(
+                content=ft.Column([self.students_bulk_bar, self.students_table, pager]),
+                border_radius=10,
+                padding=10,
+                bgcolor=ft.colors.WHITE,
+                shadow=ft.BoxShadow(
+                    spread_radius=1,
+                    blur_radius=5,
+                    color=ft.colors.GREY_300,
+                    offset=ft.Offset(0, 0)
                 ),
-                footer
+                expand=True
+            ),
+            footer
+        ],
+        spacing=0,
+        expand=True,
+        scroll=ft.ScrollMode.AUTO)
+
+    def refresh_manage_students_view(self, argument=None):
+        if not self.system.students:
+            self.notification.show_toast("لا يوجد طلاب مسجلين!", "error")
+            self.create_main_menu()
+            return False
+
+    def build_student_row(self, student):
+        if student.evaluation:
+            stars = last_rating(student)
+            rating = ft.Row([ft.Icon(ft.icons.STAR, color=ft.colors.AMBER, size=16) for _ in range(stars)])
+        else:
+            rating = ft.Text("بدون")
+
+        return ft.DataRow(
+            selected=student.id in self.students_selected,
+            on_select_changed=lambda e, s=student.id: self.select_student(s, e.data == "true"),
+            cells=[
+                ft.DataCell(ft.Text(student.id)),
+                ft.DataCell(ft.Text(student.name)),
+                ft.DataCell(ft.Text(student.group)),
+                ft.DataCell(ft.Text(f"{len(student.attendance)} يوم")),
+                ft.DataCell(rating),
+                ft.DataCell(
+                    ft.Row([
+                        ft.IconButton(
+                            icon=ft.icons.QR_CODE,
+                            icon_color=ft.colors.TEAL,
+                            tooltip="QR Code",
+                            on_click=lambda e, s=student.id: self.page.run_task(self.show_qr_dialog, s)
+                        ),
+                        ft.IconButton(
+                            icon=ft.icons.EDIT,
+                            icon_color=ft.colors.BLUE,
+                            tooltip="تعديل",
+                            on_click=lambda e, s=student.id: self.edit_student_page(s)
+                        ),
+                        ft.IconButton(
+                            icon=ft.icons.STAR,
+                            icon_color=ft.colors.AMBER,
+                            tooltip="تقييم",
+                            on_click=lambda e, s=student.id: self.evaluate_student_page(s)
+                        ),
+                        ft.IconButton(
+                            icon=ft.icons.DELETE,
+                            icon_color=ft.colors.RED,
+                            tooltip="حذف",
+                            on_click=lambda e, s=student.id: self.delete_student(s)
+                        )
+                    ], spacing=5)
+                )
+            ]
+        )
+
+    def load_students_page(self, update=False):
+        size = self.STUDENTS_PAGE_SIZE
+        filter_ids = self.students_filter_ids
+        students, total = self.system.get_students_page(self.students_page_index * size, size, filter_ids, self.students_order)
+        page_count = max(1, -(-total // size))
+        if self.students_page_index >= page_count:
+            self.students_page_index = page_count - 1
+            students, total = self.system.get_students_page(self.students_page_index * size, size, filter_ids, self.students_order)
+
+        if filter_ids is None:
+            self.students_count_label.value = f"عدد الطلاب: {total}"
+        else:
+            self.students_count_label.value = f"نتائج البحث: {total} من {len(self.system.students)}"
+
+        labels = dict(self.STUDENT_SORT_COLUMNS)
+        self.students_sort_label.value = " ثم ".join(
+            f"{labels[field]} {'↓' if descending else '↑'}" for field, descending in self.students_order
+        )
+
+        self.students_rows = {student.id: self.build_student_row(student) for student in students}
+        self.students_table.rows = list(self.students_rows.values())
+        self.students_page_label.value = f"صفحة {self.students_page_index + 1} من {page_count}"
+        self.students_prev_button.disabled = self.students_page_index == 0
+        self.students_next_button.disabled = self.students_page_index >= page_count - 1
+        if update:
+            self.ui.mark_dirty(self.students_table, self.students_count_label, self.students_sort_label,
+                               self.students_page_label, self.students_prev_button, self.students_next_button)
+
+    def patch_students_view(self, event, students):
+        visible = self.is_view_visible("/students")
+        # الإضافة والحذف يغيّران ترقيم الصفحات، فنعيد تحميل الصفحة الحالية من الجدول فقط
+        reload = event in ("student_added", "student_removed")
+        if event in ("student_added", "student_updated") and self.students_filter_ids is not None:
+            # الطالب الجديد أو المعدّل قد يطابق البحث الحالي أو يخرج منه، فنعيد تنفيذ البحث من الفهرس
+            filter_ids = self.system.search_students(self.students_search_field.value)
+            if filter_ids != self.students_filter_ids:
+                self.students_filter_ids = filter_ids
+                reload = True
+
+        if not reload:
+            rows = []
+            for student in students:
+                row = self.students_rows.get(student.id)
+                if row:
+                    row.cells = self.build_student_row(student).cells
+                    rows.append(row)
+            if visible and rows:
+                self.ui.mark_dirty(*rows)
+        else:
+            if event == "student_removed" and self.students_selected:
+                self.students_selected -= {student.id for student in students}
+                self.update_students_bulk_bar(update=visible)
+            self.load_students_page(update=visible)
+
+    def select_student(self, student_id, selected):
+        if selected:
+            self.students_selected.add(student_id)
+        else:
+            self.students_selected.discard(student_id)
+        row = self.students_rows.get(student_id)
+        if row:
+            row.selected = selected
+            self.ui.mark_dirty(row)
+        self.update_students_bulk_bar(update=True)
+
+    def select_students_page(self, e):
+        selected = e.data == "true"
+        for student_id, row in self.students_rows.items():
+            row.selected = selected
+            if selected:
+                self.students_selected.add(student_id)
+            else:
+                self.students_selected.discard(student_id)
+        self.ui.mark_dirty(self.students_table)
+        self.update_students_bulk_bar(update=True)
+
+    def select_all_students(self, e=None):
+        # كل نتائج البحث الحالي (أو كل الطلاب) وليس الصفحة الظاهرة فقط
+        ids = self.students_filter_ids if self.students_filter_ids is not None else self.system.students_by_id.keys()
+        self.students_selected = set(ids)
+        for row in self.students_rows.values():
+            row.selected = True
+        self.ui.mark_dirty(self.students_table)
+        self.update_students_bulk_bar(update=True)
+
+    def clear_students_selection(self, e=None):
+        self.students_selected = set()
+        for row in self.students_rows.values():
+            row.selected = False
+        self.ui.mark_dirty(self.students_table)
+        self.update_students_bulk_bar(update=True)
+
+    def update_students_bulk_bar(self, update=False):
+        self.students_selected_label.value = f"تم تحديد {len(self.students_selected)} طالب"
+        self.students_bulk_bar.visible = bool(self.students_selected)
+        if update:
+            self.ui.mark_dirty(self.students_bulk_bar)
+
+    def bulk_move_students(self, e):
+        async def confirm_move(e):
+            group_name = picker.value
+            if not group_name:
+                self.notification.show_toast("يجب اختيار مجموعة موجودة!", "error")
+                return
+            if await self.system.move_students_async(list(self.students_selected), group_name, self.page):
+                self.clear_students_selection()
+            dlg_modal.open = False
+            self.ui.flush_now()
+
+        picker = GroupPicker(self.system, "المجموعة الجديدة")
+        dlg_modal = ft.AlertDialog(
+            modal=True,
+            title=ft.Text(f"نقل {len(self.students_selected)} طالب"),
+            content=ft.Container(content=picker, width=350, height=300),
+            actions=[
+                ft.TextButton("نقل", on_click=confirm_move),
+                ft.TextButton("إلغاء", on_click=lambda e: self.close_bulk_dialog(dlg_modal)),
             ],
-            spacing=0,
-            expand=True,
-            scroll=ft.ScrollMode.AUTO)
+            actions_alignment=ft.MainAxisAlignment.END,
         )
-        
-        self.page.update()
+        self.open_bulk_dialog(dlg_modal)
+
+    def bulk_evaluate_students(self, e):
+        async def confirm_evaluate(e):
+            stars = self.parse_evaluation(stars_field.value, notes_field.value)
+            if stars is None:
+                return
+            if await self.system.evaluate_students_async(list(self.students_selected), stars,
+                                                         notes_field.value.strip(), self.page):
+                self.clear_students_selection()
+            dlg_modal.open = False
+            self.ui.flush_now()
+
+        stars_field = ft.TextField(
+            label="عدد النجوم (من 1 إلى 3)",
+            prefix_icon=ft.icons.STAR,
+            keyboard_type=ft.KeyboardType.NUMBER,
+            input_filter=ft.InputFilter(allow=True, regex_string=r"[1-3]"),
+            border_radius=10,
+            filled=True
+        )
+        notes_field = ft.TextField(
+            label="ملاحظات",
+            prefix_icon=ft.icons.NOTE,
+            multiline=True,
+            min_lines=3,
+            border_radius=10,
+            filled=True
+        )
+        dlg_modal = ft.AlertDialog(
+            modal=True,
+            title=ft.Text(f"تقييم {len(self.students_selected)} طالب"),
+            content=ft.Container(content=ft.Column([stars_field, notes_field], spacing=15, tight=True), width=350),
+            actions=[
+                ft.TextButton("حفظ", on_click=confirm_evaluate),
+                ft.TextButton("إلغاء", on_click=lambda e: self.close_bulk_dialog(dlg_modal)),
+            ],
+            actions_alignment=ft.MainAxisAlignment.END,
+        )
+        self.open_bulk_dialog(dlg_modal)
+
+    def bulk_delete_students(self, e):
+        async def confirm_delete(e):
+            if await self.system.delete_students_async(list(self.students_selected), self.page) and not self.system.students:
+                self.create_main_menu()
+            dlg_modal.open = False
+            self.ui.flush_now()
+
+        dlg_modal = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("تأكيد الحذف"),
+            content=ft.Text(f"هل أنت متأكد من حذف {len(self.students_selected)} طالب؟"),
+            actions=[
+                ft.TextButton("نعم", on_click=confirm_delete),
+                ft.TextButton("لا", on_click=lambda e: self.close_bulk_dialog(dlg_modal)),
+            ],
+            actions_alignment=ft.MainAxisAlignment.END,
+        )
+        self.open_bulk_dialog(dlg_modal)
+
+    def open_bulk_dialog(self, dlg_modal):
+        if not self.students_selected:
+            self.notification.show_toast("لم يتم تحديد أي طالب!", "error")
+            return
+        self.page.dialog = dlg_modal
+        dlg_modal.open = True
+        self.ui.flush_now()
+
+    def close_bulk_dialog(self, dlg_modal):
+        dlg_modal.open = False
+        self.ui.flush_now()
+
+    def sort_students(self, e):
+        # العمود المضغوط يصبح المفتاح الأساسي، والترتيب السابق يبقى مفاتيح ثانوية لكسر التعادل
+        field = self.STUDENT_SORT_COLUMNS[e.column_index][0]
+        previous = [(f, d) for f, d in self.students_order if f != field]
+        self.students_order = [(field, not e.ascending)] + previous[:self.STUDENT_SORT_DEPTH - 1]
+        self.students_table.sort_column_index = e.column_index
+        self.students_table.sort_ascending = e.ascending
+        self.students_page_index = 0
+        self.load_students_page(update=True)
+
+    def change_students_page(self, step):
+        self.students_page_index = max(0, self.students_page_index + step)
+        self.load_students_page(update=True)
 
     def filter_students(self, e):
-        search_text = e.control.value.lower()
-        filtered_students = [s for s in self.system.students 
-                            if search_text in s.name.lower() 
-                            or search_text in str(s.id)
-                            or search_text in s.group.lower()]
-        
-        # سيتم تطبيق البحث هنا عند تنفيذ الوظيفة
-        pass
+        # تأخير البحث حتى يتوقف المستخدم عن الكتابة لفترة قصيرة
+        if getattr(self, "search_timer", None):
+            self.search_timer.cancel()
+        self.search_timer = threading.Timer(0.25, self.apply_students_filter, args=(e.control.value,))
+        self.search_timer.daemon = True
+        self.search_timer.start()
 
-    def download_students_list(self, e):
-        file_path = self.system.export_students_list(self.page)
-        if file_path:
-            self.notification.show_toast(f"تم تنزيل قائمة الطلاب بنجاح في: {file_path}", "success")
+    def apply_students_filter(self, query):
+        self.students_filter_ids = self.system.search_students(query)
+        self.students_page_index = 0
+        self.load_students_page(update=True)
 
-    def edit_student_page(self, student_id):
-        self.page.clean()
-        
-        student = next((s for s in self.system.students if s.id == student_id), None)
+    async def show_qr_dialog(self, student_id):
+        student = self.system.find_student(student_id)
         if not student:
             self.notification.show_toast("الطالب غير موجود!", "error")
-            self.manage_students_page()
             return
-        
+
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(self.system.executor, QR_CACHE.get_base64, student)
+
+        async def save_qr(e):
+            path = await loop.run_in_executor(self.system.executor, student.generate_qr_code, self.page)
+            if path:
+                self.notification.show_toast(f"تم حفظ QR Code في: {os.path.abspath(path)}", "success")
+
+        dlg = ft.AlertDialog(
+            title=ft.Text(f"QR Code: {student.name}"),
+            content=ft.Column([
+                ft.Image(src_base64=image, width=250, height=250),
+                ft.Text(f"ID: {student.id} | {student.group}", size=16)
+            ], tight=True, horizontal_alignment=ft.CrossAxisAlignment.CENTER),
+            actions=[
+                ft.TextButton("حفظ كصورة", icon=ft.icons.SAVE, on_click=save_qr),
+                ft.TextButton("إغلاق", on_click=lambda e: self.close_dialog())
+            ],
+            actions_alignment=ft.MainAxisAlignment.END
+        )
+        self.page.dialog = dlg
+        dlg.open = True
+        self.ui.flush_now()
+
+    async def print_qr_cards(self, group_name=None):
+        self.notification.show_toast("جارٍ إنشاء بطاقات QR...", "info")
+        await self.system.print_qr_cards_async(self.page, group_name)
+
+    async def download_students_list(self, e):
+        file_path = await self.system.export_students_list_async(self.page)
+        if file_path:
+            self.notification.show_toast(f"تم تنزيل قائمة الطلاب بنجاح في: {file_path}", "success")
+
+    def edit_student_page(self, student_id):
+        self.navigate(f"/students/edit/{student_id}")
+
+    def build_edit_student_view(self):
+        self.edit_student_title = ft.Text("", size=24, color=ft.colors.WHITE)
         header = ft.Container(
             content=ft.Row([
                 ft.Icon(ft.icons.EDIT, size=30, color=ft.colors.WHITE),
-                ft.Text(f"تعديل بيانات الطالب: {student.name}", size=24, color=ft.colors.WHITE)
+                self.edit_student_title
             ]),
             padding=15,
             bgcolor=ft.colors.BLUE_300,
@@ -1662,42 +4147,32 @@ class App:
             width=self.page.width
         )
         
-        self.entry_student_name = ft.TextField(
+        # حقول منفصلة عن صفحة الإضافة لأن الصفحتين محفوظتان معاً
+        self.edit_student_name = ft.TextField(
             label="اسم الطالب",
             prefix_icon=ft.icons.PERSON,
             border_radius=10,
             filled=True,
-            value=student.name,
             expand=True
         )
         
-        self.entry_phone = ft.TextField(
+        self.edit_student_phone = ft.TextField(
             label="رقم الهاتف",
             prefix_icon=ft.icons.PHONE,
-            value=student.phone,
             keyboard_type=ft.KeyboardType.PHONE,
             border_radius=10,
             filled=True,
             expand=True
         )
         
-        groups = [group.name for group in self.system.groups]
-        self.group_dropdown = ft.Dropdown(
-            label="اختر المجموعة",
-            prefix_icon=ft.icons.GROUP,
-            options=[ft.dropdown.Option(group) for group in groups],
-            border_radius=10,
-            filled=True,
-            value=student.group,
-            expand=True
-        )
+        self.edit_student_group = GroupPicker(self.system)
         
         form = ft.Card(
             content=ft.Container(
                 content=ft.Column([
-                    self.entry_student_name,
-                    self.entry_phone,
-                    self.group_dropdown
+                    self.edit_student_name,
+                    self.edit_student_phone,
+                    self.edit_student_group
                 ], spacing=15),
                 padding=20
             ),
@@ -1709,7 +4184,7 @@ class App:
             ft.FilledButton(
                 text="حفظ التعديلات",
                 icon=ft.icons.SAVE,
-                on_click=lambda e: self.save_student_edit(student_id),
+                on_click=self.save_student_edit,
                 style=ft.ButtonStyle(
                     shape=ft.RoundedRectangleBorder(radius=10),
                     padding=20
@@ -1726,24 +4201,33 @@ class App:
             )
         ], spacing=20, alignment=ft.MainAxisAlignment.END)
         
-        self.page.add(
-            ft.Column([
-                header,
-                ft.Divider(height=20),
-                form,
-                ft.Divider(height=20),
-                controls
-            ],
-            spacing=0,
-            scroll=ft.ScrollMode.AUTO)
-        )
+        return ft.Column([
+            header,
+            ft.Divider(height=20),
+            form,
+            ft.Divider(height=20),
+            controls
+        ],
+        spacing=0,
+        scroll=ft.ScrollMode.AUTO)
+
+    def refresh_edit_student_view(self, student_id):
+        student = self.system.find_student(int(student_id)) if student_id and student_id.isdigit() else None
+        if not student:
+            self.notification.show_toast("الطالب غير موجود!", "error")
+            self.manage_students_page()
+            return False
         
-        self.page.update()
+        self.editing_student_id = student.id
+        self.edit_student_title.value = f"تعديل بيانات الطالب: {student.name}"
+        self.edit_student_name.value = student.name
+        self.edit_student_phone.value = student.phone
+        self.edit_student_group.value = student.group
 
-    def save_student_edit(self, student_id):
-        new_name = self.entry_student_name.value.strip()
-        new_phone = self.entry_phone.value.strip()
-        new_group = self.group_dropdown.value
+    async def save_student_edit(self, e):
+        new_name = self.edit_student_name.value.strip()
+        new_phone = self.edit_student_phone.value.strip()
+        new_group = self.edit_student_group.value
         
         if not new_name:
             self.notification.show_toast("يجب إدخال اسم الطالب!", "error")
@@ -1757,24 +4241,18 @@ class App:
             self.notification.show_toast("يجب اختيار المجموعة!", "error")
             return
         
-        if self.system.edit_student(student_id, new_name, new_phone, new_group, self.page):
+        if await self.system.edit_student_async(self.editing_student_id, new_name, new_phone, new_group, self.page):
             self.manage_students_page()
 
     def evaluate_student_page(self, student_id):
-        self.page.clean()
-        
-        student = next((s for s in self.system.students if s.id == student_id), None)
-        if not student:
-            self.notification.show_toast("الطالب غير موجود!", "error")
-            self.manage_students_page()
-            return
-        
-        self.student_id = student_id
-        
+        self.navigate(f"/students/evaluate/{student_id}")
+
+    def build_evaluate_student_view(self):
+        self.evaluate_student_title = ft.Text("", size=24, color=ft.colors.WHITE)
         header = ft.Container(
             content=ft.Row([
                 ft.Icon(ft.icons.STAR, size=30, color=ft.colors.WHITE),
-                ft.Text(f"تقييم الطالب: {student.name}", size=24, color=ft.colors.WHITE)
+                self.evaluate_student_title
             ]),
             padding=15,
             bgcolor=ft.colors.AMBER_300,
@@ -1835,56 +4313,70 @@ class App:
             )
         ], spacing=20, alignment=ft.MainAxisAlignment.END)
         
-        self.page.add(
-            ft.Column([
-                header,
-                ft.Divider(height=20),
-                form,
-                ft.Divider(height=20),
-                controls
-            ],
-            spacing=0,
-            scroll=ft.ScrollMode.AUTO)
-        )
-        
-        self.page.update()
+        return ft.Column([
+            header,
+            ft.Divider(height=20),
+            form,
+            ft.Divider(height=20),
+            controls
+        ],
+        spacing=0,
+        scroll=ft.ScrollMode.AUTO)
 
-    def save_evaluation(self, e):
-        stars = self.entry_stars.value.strip()
-        notes = self.entry_notes.value.strip()
+    def refresh_evaluate_student_view(self, student_id):
+        student = self.system.find_student(int(student_id)) if student_id and student_id.isdigit() else None
+        if not student:
+            self.notification.show_toast("الطالب غير موجود!", "error")
+            self.manage_students_page()
+            return False
         
+        self.student_id = student.id
+        self.evaluate_student_title.value = f"تقييم الطالب: {student.name}"
+        self.entry_stars.value = ""
+        self.entry_notes.value = ""
+
+    def parse_evaluation(self, stars, notes):
+        # يُرجع عدد النجوم كرقم، أو None بعد عرض سبب الرفض
+        stars = (stars or "").strip()
         if not stars:
             self.notification.show_toast("يجب إدخال عدد النجوم!", "error")
-            return
+            return None
         
-        if not notes:
+        if not (notes or "").strip():
             self.notification.show_toast("يجب إدخال الملاحظات!", "error")
-            return
+            return None
         
         try:
             stars_int = int(stars)
             if stars_int < 1 or stars_int > 3:
                 self.notification.show_toast("عدد النجوم يجب أن يكون بين 1 و 3!", "error")
-                return
+                return None
         except ValueError:
             self.notification.show_toast("عدد النجوم يجب أن يكون رقماً بين 1 و 3!", "error")
+            return None
+        return stars_int
+
+    async def save_evaluation(self, e):
+        stars_int = self.parse_evaluation(self.entry_stars.value, self.entry_notes.value)
+        if stars_int is None:
             return
         
-        if self.system.evaluate_student(self.student_id, stars_int, notes, self.page):
+        if await self.system.evaluate_student_async(self.student_id, stars_int, self.entry_notes.value.strip(), self.page):
             self.manage_students_page()
 
     def delete_student(self, student_id):
-        def confirm_delete(e):
-            if self.system.delete_student(student_id, self.page):
-                self.manage_students_page()
+        async def confirm_delete(e):
+            # الصف يُحذف من الجدول عبر حدث student_removed، ولا حاجة لإعادة تحميل الصفحة
+            if await self.system.delete_student_async(student_id, self.page) and not self.system.students:
+                self.create_main_menu()
             dlg_modal.open = False
-            self.page.update()
+            self.ui.flush_now()
         
         def cancel_delete(e):
             dlg_modal.open = False
-            self.page.update()
+            self.ui.flush_now()
         
-        student = next((s for s in self.system.students if s.id == student_id), None)
+        student = self.system.find_student(student_id)
         if not student:
             self.notification.show_toast("الطالب غير موجود!", "error")
             return
@@ -1902,11 +4394,12 @@ class App:
         
         self.page.dialog = dlg_modal
         dlg_modal.open = True
-        self.page.update()
+        self.ui.flush_now()
 
     def record_attendance_page(self, e=None):
-        self.page.clean()
-        
+        self.navigate("/attendance")
+
+    def build_record_attendance_view(self):
         header = ft.Container(
             content=ft.Row([
                 ft.Icon(ft.icons.CHECK_CIRCLE, size=30, color=ft.colors.WHITE),
@@ -1924,16 +4417,32 @@ class App:
                     ft.Icon(ft.icons.QR_CODE, size=50, color=ft.colors.TEAL),
                     ft.Text("مسح QR Code", size=18),
                     ft.Text("استخدم كاميرا الجهاز لمسح كود الطالب", size=14, color=ft.colors.GREY),
-                    ft.FilledButton(
+                    self.data_control(ft.FilledButton(
                         "بدء المسح",
                         icon=ft.icons.CAMERA_ALT,
-                        on_click=lambda e: self.system.scan_qr_code(self.page),
+                        on_click=lambda e: self.page.run_task(self.system.scan_qr_code_async, self.page),
                         style=ft.ButtonStyle(
                             shape=ft.RoundedRectangleBorder(radius=10),
                             padding=15
                         ),
                         width=200
-                    )
+                    )),
+                    self.data_control(ft.OutlinedButton(
+                        "مسح مستمر",
+                        icon=ft.icons.QR_CODE_SCANNER,
+                        on_click=lambda e: self.page.run_task(self.system.kiosk_scan_async, self.page),
+                        style=ft.ButtonStyle(
+                            shape=ft.RoundedRectangleBorder(radius=10),
+                            padding=15
+                        ),
+                        width=200
+                    )),
+                    self.data_control(ft.TextButton(
+                        "من صور أو فيديو",
+                        icon=ft.icons.PHOTO_LIBRARY,
+                        on_click=self.pick_attendance_media,
+                        width=200
+                    ))
                 ], 
                 horizontal_alignment=ft.CrossAxisAlignment.CENTER,
                 alignment=ft.MainAxisAlignment.CENTER),
@@ -1942,7 +4451,7 @@ class App:
             ),
             elevation=5,
             width=300,
-            height=250
+            height=340
         )
         
         manual_card = ft.Card(
@@ -1970,25 +4479,28 @@ class App:
             ),
             elevation=5,
             width=300,
-            height=250
+            height=340
         )
         
+        self.attendance_date_label = ft.Text("", size=14, color=ft.colors.GREY)
+        self.attendance_present_label = ft.Text("0", size=24, weight=ft.FontWeight.BOLD)
+        self.attendance_absent_label = ft.Text("0", size=24, weight=ft.FontWeight.BOLD)
         stats_card = ft.Card(
             content=ft.Container(
                 content=ft.Column([
                     ft.Icon(ft.icons.ANALYTICS, size=50, color=ft.colors.ORANGE),
                     ft.Text("إحصائيات اليوم", size=18),
-                    ft.Text(datetime.now().strftime("%Y-%m-%d"), size=14, color=ft.colors.GREY),
+                    self.attendance_date_label,
                     ft.Divider(),
                     ft.Row([
                         ft.Column([
                             ft.Text("الحضور", size=14),
-                            ft.Text("0", size=24, weight=ft.FontWeight.BOLD)
+                            self.attendance_present_label
                         ], horizontal_alignment=ft.CrossAxisAlignment.CENTER),
                         ft.VerticalDivider(),
                         ft.Column([
                             ft.Text("الغياب", size=14),
-                            ft.Text("0", size=24, weight=ft.FontWeight.BOLD)
+                            self.attendance_absent_label
                         ], horizontal_alignment=ft.CrossAxisAlignment.CENTER)
                     ], spacing=20)
                 ],
@@ -1999,7 +4511,7 @@ class App:
             ),
             elevation=5,
             width=300,
-            height=250
+            height=340
         )
         
         footer = ft.Container(
@@ -2017,35 +4529,40 @@ class App:
             padding=10
         )
         
-        self.page.add(
-            ft.Column([
-                header,
-                ft.Divider(height=20),
-                ft.ResponsiveRow(
-                    columns=12,
-                    controls=[
-                        ft.Container(qr_card, col={"sm": 12, "md": 4}),
-                        ft.Container(manual_card, col={"sm": 12, "md": 4}),
-                        ft.Container(stats_card, col={"sm": 12, "md": 4})
-                    ],
-                    spacing=20,
-                    run_spacing=20
-                ),
-                ft.Divider(height=20),
-                footer
-            ],
-            spacing=0,
-            scroll=ft.ScrollMode.AUTO)
-        )
-        
-        self.page.update()
+        return ft.Column([
+            header,
+            ft.Divider(height=20),
+            ft.ResponsiveRow(
+                columns=12,
+                controls=[
+                    ft.Container(qr_card, col={"sm": 12, "md": 4}),
+                    ft.Container(manual_card, col={"sm": 12, "md": 4}),
+                    ft.Container(stats_card, col={"sm": 12, "md": 4})
+                ],
+                spacing=20,
+                run_spacing=20
+            ),
+            ft.Divider(height=20),
+            footer
+        ],
+        spacing=0,
+        scroll=ft.ScrollMode.AUTO)
+
+    def refresh_record_attendance_view(self, argument=None):
+        self.attendance_date_label.value = datetime.now().strftime("%Y-%m-%d")
+        if not self.system.ready.is_set():
+            self.attendance_present_label.value = self.attendance_absent_label.value = "..."
+            return
+        present, absent = self.system.get_today_stats()
+        self.attendance_present_label.value = str(present)
+        self.attendance_absent_label.value = str(absent)
 
     def pick_date(self, target_field):
         def on_date_selected(e):
             target_field.value = e.control.value.strftime("%Y-%m-%d")
-            self.page.update()
-            self.page.dialog.open = False
-            self.page.update()
+            if self.page.dialog:
+                self.page.dialog.open = False
+            self.ui.flush_now()
 
         date_picker = ft.DatePicker(
             on_change=on_date_selected,
@@ -2054,11 +4571,30 @@ class App:
         )
         
         self.page.overlay.append(date_picker)
-        self.page.update()
+        self.ui.flush_now()
         
         date_picker.pick_date()
 
-    def record_attendance(self, e):
+    def pick_attendance_media(self, e=None):
+        async def on_result(result):
+            paths = [f.path for f in (result.files or []) if f.path]
+            if not paths:
+                return
+            self.notification.show_toast(f"جارٍ قراءة {len(paths)} ملف...", "info")
+            await self.system.import_attendance_from_media_async(paths, self.page)
+
+        if not hasattr(self, "media_picker"):
+            self.media_picker = ft.FilePicker()
+            self.page.overlay.append(self.media_picker)
+            self.ui.flush_now()
+        self.media_picker.on_result = on_result
+        self.media_picker.pick_files(
+            dialog_title="اختر صور أو فيديو للفصل",
+            allow_multiple=True,
+            allowed_extensions=["png", "jpg", "jpeg", "bmp", "webp", "mp4", "avi", "mov", "mkv"]
+        )
+
+    async def record_attendance(self, e):
         student_id = self.entry_student_id.value.strip()
         if not student_id:
             self.notification.show_toast("يجب إدخال ID الطالب!", "error")
@@ -2066,15 +4602,16 @@ class App:
         
         try:
             student_id_int = int(student_id)
-            if self.system.record_attendance(student_id_int, self.page):
+            if await self.system.record_attendance_async(student_id_int, self.page):
                 self.entry_student_id.value = ""
-                self.page.update()
+                self.ui.mark_dirty(self.entry_student_id)
         except ValueError:
             self.notification.show_toast("ID الطالب يجب أن يكون رقماً صحيحاً!", "error")
 
     def generate_report_page(self, e=None):
-        self.page.clean()
-        
+        self.navigate("/reports/monthly")
+
+    def build_generate_report_view(self):
         header = ft.Container(
             content=ft.Row([
                 ft.Icon(ft.icons.ASSIGNMENT, size=30, color=ft.colors.WHITE),
@@ -2161,21 +4698,17 @@ class App:
             )
         ], spacing=20, alignment=ft.MainAxisAlignment.END)
         
-        self.page.add(
-            ft.Column([
-                header,
-                ft.Divider(height=20),
-                form,
-                ft.Divider(height=20),
-                controls
-            ],
-            spacing=0,
-            scroll=ft.ScrollMode.AUTO)
-        )
-        
-        self.page.update()
+        return ft.Column([
+            header,
+            ft.Divider(height=20),
+            form,
+            ft.Divider(height=20),
+            controls
+        ],
+        spacing=0,
+        scroll=ft.ScrollMode.AUTO)
 
-    def generate_report(self, e):
+    async def generate_report(self, e):
         student_id = self.entry_report_id.value.strip()
         start_date = self.start_date_picker.value.strip()
         end_date = self.end_date_picker.value.strip()
@@ -2190,21 +4723,17 @@ class App:
         
         try:
             student_id_int = int(student_id)
-            self.system.generate_monthly_report(student_id_int, start_date, end_date, self.page)
+            await self.system.generate_monthly_report_async(student_id_int, start_date, end_date, self.page)
         except ValueError:
             self.notification.show_toast("ID الطالب يجب أن يكون رقماً صحيحاً!", "error")
 
-    def download_report(self, e):
-        self.generate_report(e)
+    async def download_report(self, e):
+        await self.generate_report(e)
 
     def group_report_page(self, e=None):
-        self.page.clean()
-        
-        if not self.system.groups:
-            self.notification.show_toast("لا توجد مجموعات متاحة!", "error")
-            self.create_main_menu()
-            return
-            
+        self.navigate("/reports/group")
+
+    def build_group_report_view(self):
         header = ft.Container(
             content=ft.Row([
                 ft.Icon(ft.icons.ANALYTICS, size=30, color=ft.colors.WHITE),
@@ -2219,16 +4748,9 @@ class App:
         today = datetime.now().strftime("%Y-%m-%d")
         first_day_of_month = datetime.now().replace(day=1).strftime("%Y-%m-%d")
         
-        self.group_dropdown = ft.Dropdown(
-            label="اختر المجموعة",
-            prefix_icon=ft.icons.GROUP,
-            options=[ft.dropdown.Option(group.name) for group in self.system.groups],
-            border_radius=10,
-            filled=True,
-            expand=True
-        )
+        self.group_report_dropdown = GroupPicker(self.system)
         
-        self.start_date_picker = ft.TextField(
+        self.group_start_date_picker = ft.TextField(
             label="تاريخ البداية",
             value=first_day_of_month,
             prefix_icon=ft.icons.CALENDAR_TODAY,
@@ -2238,11 +4760,11 @@ class App:
             expand=True,
             suffix=ft.IconButton(
                 icon=ft.icons.CALENDAR_MONTH,
-                on_click=lambda e: self.pick_date(self.start_date_picker)
+                on_click=lambda e: self.pick_date(self.group_start_date_picker)
             )
         )
         
-        self.end_date_picker = ft.TextField(
+        self.group_end_date_picker = ft.TextField(
             label="تاريخ النهاية",
             value=today,
             prefix_icon=ft.icons.CALENDAR_TODAY,
@@ -2252,17 +4774,17 @@ class App:
             expand=True,
             suffix=ft.IconButton(
                 icon=ft.icons.CALENDAR_MONTH,
-                on_click=lambda e: self.pick_date(self.end_date_picker)
+                on_click=lambda e: self.pick_date(self.group_end_date_picker)
             )
         )
         
         form = ft.Card(
             content=ft.Container(
                 content=ft.Column([
-                    self.group_dropdown,
+                    self.group_report_dropdown,
                     ft.Text("فترة التقرير:", size=18),
-                    self.start_date_picker,
-                    self.end_date_picker
+                    self.group_start_date_picker,
+                    self.group_end_date_picker
                 ], spacing=15),
                 padding=20
             ),
@@ -2300,24 +4822,29 @@ class App:
             )
         ], spacing=20, alignment=ft.MainAxisAlignment.END)
         
-        self.page.add(
-            ft.Column([
-                header,
-                ft.Divider(height=20),
-                form,
-                ft.Divider(height=20),
-                controls
-            ],
-            spacing=0,
-            scroll=ft.ScrollMode.AUTO)
-        )
+        return ft.Column([
+            header,
+            ft.Divider(height=20),
+            form,
+            ft.Divider(height=20),
+            controls
+        ],
+        spacing=0,
+        scroll=ft.ScrollMode.AUTO)
+
+    def refresh_group_report_view(self, argument=None):
+        if not self.system.groups:
+            self.notification.show_toast("لا توجد مجموعات متاحة!", "error")
+            self.create_main_menu()
+            return False
         
-        self.page.update()
+        # نُبقي الاختيار السابق إن كانت المجموعة ما زالت موجودة
+        self.group_report_dropdown.value = self.group_report_dropdown.value
 
-    def generate_group_report(self, e):
-        group_name = self.group_dropdown.value
-        start_date = self.start_date_picker.value.strip()
-        end_date = self.end_date_picker.value.strip()
+    async def generate_group_report(self, e):
+        group_name = self.group_report_dropdown.value
+        start_date = self.group_start_date_picker.value.strip()
+        end_date = self.group_end_date_picker.value.strip()
         
         if not group_name:
             self.notification.show_toast("يجب اختيار المجموعة!", "error")
@@ -2327,14 +4854,15 @@ class App:
             self.notification.show_toast("يجب تحديد تاريخ البداية والنهاية!", "error")
             return
         
-        self.system.generate_group_report(group_name, start_date, end_date, self.page)
+        await self.system.generate_group_report_async(group_name, start_date, end_date, self.page)
 
-    def download_group_report(self, e):
-        self.generate_group_report(e)
+    async def download_group_report(self, e):
+        await self.generate_group_report(e)
 
     def how_to_use_page(self, e=None):
-        self.page.clean()
-        
+        self.navigate("/help")
+
+    def build_how_to_use_view(self):
         header = ft.Container(
             content=ft.Row([
                 ft.Icon(ft.icons.HELP, size=30, color=ft.colors.WHITE),
@@ -2358,12 +4886,14 @@ class App:
                     ft.Text("2. إضافة طالب:", size=18, weight=ft.FontWeight.BOLD),
                     ft.Text("- اضغط على زر 'إضافة طالب' من القائمة الرئيسية"),
                     ft.Text("- أدخل اسم الطالب ورقم هاتفه واختر مجموعته"),
-                    ft.Text("- سيتم إنشاء QR Code للطالب تلقائياً"),
+                    ft.Text("- يمكنك عرض QR Code الطالب أو طباعته من صفحة إدارة الطلاب"),
                     ft.Divider(),
                     
                     ft.Text("3. تسجيل الحضور:", size=18, weight=ft.FontWeight.BOLD),
                     ft.Text("- اضغط على زر 'تسجيل الحضور' من القائمة الرئيسية"),
                     ft.Text("- يمكنك مسح QR Code الطالب أو إدخال ID يدوياً"),
+                    ft.Text("- استخدم 'مسح مستمر' لتسجيل حضور الفصل كله دون إعادة فتح الكاميرا"),
+                    ft.Text("- أو اختر 'من صور أو فيديو' لتسجيل كل الأكواد الظاهرة في صورة أو مقطع للفصل"),
                     ft.Text("- سيتم تسجيل الحضور تلقائياً إذا كان اليوم من أيام المجموعة"),
                     ft.Divider(),
                     
@@ -2401,20 +4931,32 @@ class App:
             padding=10
         )
         
-        self.page.add(
-            ft.Column([
-                header,
-                ft.Divider(height=20),
-                instructions,
-                footer
-            ],
-            spacing=0,
-            scroll=ft.ScrollMode.AUTO)
-        )
-        
-        self.page.update()
+        return ft.Column([
+            header,
+            ft.Divider(height=20),
+            instructions,
+            footer
+        ],
+        spacing=0,
+        scroll=ft.ScrollMode.AUTO)
+
+STARTUP.record("module", MODULE_STARTED)
 
 def main(page: ft.Page):
-    app = App(page)
+    bootstrap()
+    app = App(page, AttendanceSystem.shared(background=True))
 
-ft.app(target=main, view=ft.AppView.FLET_APP)
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    if "--benchmark-scanner" in sys.argv:
+        # مثال: python main.py --benchmark-scanner video.mp4
+        args = sys.argv[sys.argv.index("--benchmark-scanner") + 1:]
+        source = FileSource(args[0]) if args else SyntheticQRSource(range(10000, 10020))
+        print(benchmark_scanner(source))
+    elif "--web" in sys.argv:
+        # مثال: python main.py --web 8550 ثم افتح http://<جهاز السنتر>:8550 من أي متصفح
+        args = sys.argv[sys.argv.index("--web") + 1:]
+        port = int(args[0]) if args and args[0].isdigit() else 8550
+        ft.app(target=main, view=ft.AppView.WEB_BROWSER, host="0.0.0.0", port=port)
+    else:
+        ft.app(target=main, view=ft.AppView.FLET_APP)